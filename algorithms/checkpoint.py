@@ -0,0 +1,79 @@
+import os
+import tempfile
+
+import numpy as np
+
+from algorithms.optimizer import INTEGER_GENES
+
+""" Compact binary checkpoints of a genetic algorithm run (written atomically) """
+
+
+def save_checkpoint(path, state):
+    """
+    Write a checkpoint atomically: the data goes to a temporary file that then replaces `path`
+    :param path: str, path of the checkpoint (.npz)
+    :param state: dict of arrays/scalars, as returned by GeneticAlgorithm.get_state
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            np.savez_compressed(file, **state)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_checkpoint(path):
+    """
+    Read a checkpoint written by save_checkpoint
+    :param path: str, path of the checkpoint (.npz)
+    :return: dict with the stored arrays (0-d arrays are converted to Python scalars)
+    """
+    with np.load(path) as data:
+        return {key: data[key].item() if data[key].ndim == 0 else data[key] for key in data.files}
+
+
+def encode_population(population, num_genes):
+    """
+    Convert a list of individuals into a float array
+    :param population: list of lists of genes
+    :param num_genes: int, number of genes per individual
+    :return: numpy array of shape (N, num_genes)
+    """
+    return np.array(population, dtype=np.float64).reshape(-1, num_genes)
+
+
+def decode_population(array):
+    """
+    Convert a float array back into a list of individuals, restoring the integer genes
+    :param array: numpy array of shape (N, num_genes)
+    :return: list of lists of genes
+    """
+    population = array.tolist()
+    for individual in population:
+        for i in INTEGER_GENES:
+            individual[i] = int(individual[i])
+    return population
+
+
+def encode_rng_state(state):
+    """
+    Convert the state of a random.Random generator into arrays
+    :param state: tuple returned by random.Random.getstate()
+    :return: tuple (version, internal state array, gauss_next)
+    """
+    version, internal_state, gauss_next = state
+    return version, np.array(internal_state, dtype=np.uint32), np.nan if gauss_next is None else gauss_next
+
+
+def decode_rng_state(version, internal_state, gauss_next):
+    """
+    Convert arrays back into a state for random.Random.setstate()
+    """
+    gauss_next = None if np.isnan(gauss_next) else float(gauss_next)
+    return version, tuple(int(x) for x in internal_state), gauss_next
@@ -0,0 +1,100 @@
+import numpy as np
+
+from algorithms.optimizer import Optimizer, INTEGER_GENES
+
+""" CMA-ES (covariance matrix adaptation evolution strategy) over the normalized tower genes """
+
+
+class CMAES(Optimizer):
+    def __init__(self, tower_type, population_size=None, sigma=0.3, seed=None, initial_mean=None):
+        """
+        (mu/mu_w, lambda)-CMA-ES that maximizes the fitness, working in the unit hypercube of the genes
+        :param tower_type: str, tower type in settings.TOWER_TYPES
+        :param population_size: int, number of candidates per generation (lambda); default 4 + 3 ln(n)
+        :param sigma: float, initial step size (in the unit hypercube)
+        :param seed: int, seed for the random number generator
+        :param initial_mean: individual to start the search from (default: center of the bounds)
+        """
+        super().__init__(tower_type)
+        n = self.num_genes
+        self.rng = np.random.default_rng(seed)
+        self.population_size = population_size or 4 + int(3 * np.log(n))
+        self.mu = self.population_size // 2
+
+        # recombination weights and strategy parameters (default values from Hansen's tutorial)
+        weights = np.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+        self.weights = weights / weights.sum()
+        self.mueff = 1 / np.sum(self.weights ** 2)
+        self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+        self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+        self.c1 = 2 / ((n + 1.3) ** 2 + self.mueff)
+        self.cmu = min(1 - self.c1, 2 * (self.mueff - 2 + 1 / self.mueff) / ((n + 2) ** 2 + self.mueff))
+        self.damps = 1 + 2 * max(0, np.sqrt((self.mueff - 1) / (n + 1)) - 1) + self.cs
+        self.chi_n = np.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n ** 2))
+
+        # state
+        if initial_mean is None:
+            self.mean = np.full(n, 0.5)
+        else:
+            self.mean = self.encode([initial_mean])[0]
+        self.sigma = sigma
+        self.pc = np.zeros(n)
+        self.ps = np.zeros(n)
+        self.C = np.eye(n)
+        self.B = np.eye(n)
+        self.D = np.ones(n)
+        self.samples = None
+
+        # integer genes: keep a minimum spread of a fraction of the grid step, otherwise the search stalls on
+        # a plateau once the distribution becomes narrower than one integer value
+        self.min_std = np.zeros(n)
+        self.min_std[INTEGER_GENES] = 0.3 / (self.upper[INTEGER_GENES] - self.lower[INTEGER_GENES])
+
+    def ask(self):
+        """
+        Sample a new generation from the current search distribution
+        :return: list of individuals
+        """
+        z = self.rng.standard_normal((self.population_size, self.num_genes))
+        x = self.mean + self.sigma * (z * self.D) @ self.B.T
+        extra_std = np.sqrt(np.maximum(0, self.min_std ** 2 - self.sigma ** 2 * np.diag(self.C)))
+        x += extra_std * self.rng.standard_normal(x.shape)
+        # candidates outside the bounds are repaired (clipped) before being evaluated and used in the update
+        self.samples = np.clip(x, 0, 1)
+        return self.decode(self.samples)
+
+    def tell(self, fitnesses):
+        """
+        Update the mean, step size and covariance matrix with the best candidates
+        :param fitnesses: sequence of floats, in the same order as the candidates
+        """
+        fitnesses = np.asarray(fitnesses, dtype=np.float64)
+        self.record(self.decode(self.samples), fitnesses)
+        n = self.num_genes
+
+        order = np.argsort(-fitnesses, kind="stable")[:self.mu]
+        y = (self.samples[order] - self.mean) / self.sigma  # (mu, n)
+        y_w = self.weights @ y
+        self.mean = self.mean + self.sigma * y_w
+
+        # evolution paths
+        inv_sqrt_C = self.B @ np.diag(1 / self.D) @ self.B.T
+        self.ps = (1 - self.cs) * self.ps + np.sqrt(self.cs * (2 - self.cs) * self.mueff) * inv_sqrt_C @ y_w
+        generation = self.current_generation + 1
+        hsig = (np.linalg.norm(self.ps) / np.sqrt(1 - (1 - self.cs) ** (2 * generation))
+                < (1.4 + 2 / (n + 1)) * self.chi_n)
+        self.pc = (1 - self.cc) * self.pc + hsig * np.sqrt(self.cc * (2 - self.cc) * self.mueff) * y_w
+
+        # covariance matrix: rank-one and rank-mu updates
+        rank_one = np.outer(self.pc, self.pc) + (1 - hsig) * self.cc * (2 - self.cc) * self.C
+        rank_mu = (y.T * self.weights) @ y
+        self.C = (1 - self.c1 - self.cmu) * self.C + self.c1 * rank_one + self.cmu * rank_mu
+
+        # step size
+        self.sigma *= np.exp((self.cs / self.damps) * (np.linalg.norm(self.ps) / self.chi_n - 1))
+
+        # eigendecomposition for the next sampling (the matrix is tiny, so it is done every generation)
+        self.C = (self.C + self.C.T) / 2
+        eigenvalues, self.B = np.linalg.eigh(self.C)
+        self.D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+        self.current_generation = generation
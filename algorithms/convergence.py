@@ -0,0 +1,92 @@
+import numpy as np
+
+""" Per-generation convergence and diversity diagnostics of a population-based optimizer """
+
+HISTORY_COLUMNS = ("generation", "best", "mean", "std", "diversity", "unique", "stall", "mutation_rate")
+
+
+class ConvergenceMonitor:
+    def __init__(self, stall_generations=None, min_diversity=None, tolerance=1e-6):
+        """
+        Track the fitness and genotype diversity of every generation and detect when a run stops making progress
+        :param stall_generations: int, generations without improving the best fitness before the run is
+        considered stalled (None to disable)
+        :param min_diversity: float, genotype diversity below which the population is considered collapsed
+        (None to disable)
+        :param tolerance: float, minimum increase of the best fitness that counts as an improvement
+        """
+        self.stall_generations = stall_generations
+        self.min_diversity = min_diversity
+        self.tolerance = tolerance
+        self.history = np.empty((0, len(HISTORY_COLUMNS)))
+        self.best = -np.inf
+        self.stall_count = 0
+
+    def update(self, generation, fitnesses, genes, mutation_rate=np.nan):
+        """
+        Record the diagnostics of a generation
+        :param generation: int, generation number
+        :param fitnesses: sequence of floats, fitness of every individual
+        :param genes: numpy array of shape (N, num_genes), genes normalized to the unit hypercube
+        :param mutation_rate: float, mutation rate used to create the next generation
+        :return: dict with the diagnostics (see HISTORY_COLUMNS)
+        """
+        fitnesses = np.asarray(fitnesses, dtype=np.float64)
+        genes = np.asarray(genes, dtype=np.float64)
+        best = fitnesses.max()
+        if best > self.best + self.tolerance:
+            self.best = best
+            self.stall_count = 0
+        else:
+            self.stall_count += 1
+
+        row = np.array([generation, best, fitnesses.mean(), fitnesses.std(), self.diversity(genes),
+                        len(np.unique(genes, axis=0)) / len(genes), self.stall_count, mutation_rate])
+        self.history = np.vstack([self.history, row])
+        return dict(zip(HISTORY_COLUMNS, row.tolist()))
+
+    @staticmethod
+    def diversity(genes):
+        """
+        Calculate the genotype diversity of a population
+        :param genes: numpy array of shape (N, num_genes), genes normalized to the unit hypercube
+        :return: float, mean standard deviation of the genes (0 when every individual is a clone)
+        """
+        return float(genes.std(axis=0).mean()) if len(genes) else 0.0
+
+    def last(self):
+        """
+        Get the diagnostics of the last generation
+        :return: dict (see HISTORY_COLUMNS), or None before the first update
+        """
+        if not len(self.history):
+            return None
+        return dict(zip(HISTORY_COLUMNS, self.history[-1].tolist()))
+
+    def is_stalled(self):
+        """
+        :return: bool, True if the best fitness has not improved for stall_generations generations
+        """
+        return self.stall_generations is not None and self.stall_count >= self.stall_generations
+
+    def is_collapsed(self):
+        """
+        :return: bool, True if the diversity of the last generation is below min_diversity
+        """
+        return (self.min_diversity is not None and len(self.history) > 0
+                and self.history[-1, HISTORY_COLUMNS.index("diversity")] < self.min_diversity)
+
+    def set_history(self, history):
+        """
+        Restore the diagnostics of a run (e.g. from a checkpoint), including the best fitness and stall count
+        :param history: numpy array of shape (G, len(HISTORY_COLUMNS))
+        """
+        self.history = np.asarray(history, dtype=np.float64).reshape(-1, len(HISTORY_COLUMNS))
+        if len(self.history):
+            # the best fitness is the one of the last generation that improved it
+            stall = self.history[:, HISTORY_COLUMNS.index("stall")]
+            self.best = self.history[np.flatnonzero(stall == 0)[-1], HISTORY_COLUMNS.index("best")]
+            self.stall_count = int(stall[-1])
+        else:
+            self.best = -np.inf
+            self.stall_count = 0
@@ -0,0 +1,66 @@
+import numpy as np
+
+from algorithms.optimizer import Optimizer
+
+""" Differential evolution (DE/rand/1/bin) over the normalized tower genes """
+
+
+class DifferentialEvolution(Optimizer):
+    def __init__(self, tower_type, population_size=20, differential_weight=0.7, crossover_rate=0.9, seed=None,
+                 initial_population=None):
+        """
+        Differential evolution that maximizes the fitness, working in the unit hypercube of the genes
+        :param tower_type: str, tower type in settings.TOWER_TYPES
+        :param population_size: int, number of candidates per generation (at least 4)
+        :param differential_weight: float, scale of the difference vector (F)
+        :param crossover_rate: float, probability of taking each gene from the mutant (CR)
+        :param seed: int, seed for the random number generator
+        :param initial_population: list of individuals to seed the first population with
+        """
+        super().__init__(tower_type)
+        self.population_size = max(4, population_size)
+        self.differential_weight = differential_weight
+        self.crossover_rate = crossover_rate
+        self.rng = np.random.default_rng(seed)
+        self.population = self.rng.random((self.population_size, self.num_genes))
+        if initial_population:
+            seeds = self.encode(initial_population)[:self.population_size]
+            self.population[:len(seeds)] = seeds
+        self.fitness = None  # fitness of the population (unknown until the first tell)
+        self.trials = self.population
+
+    def ask(self):
+        """
+        Get the initial population (first generation) or a trial vector for every member of the population
+        :return: list of individuals
+        """
+        if self.fitness is None:
+            self.trials = self.population
+            return self.decode(self.trials)
+
+        size, n = self.population.shape
+        # three distinct members, all different from the target: shift random offsets away from it
+        offsets = np.argsort(self.rng.random((size, size - 1)), axis=1)[:, :3] + 1
+        a, b, c = ((np.arange(size)[:, None] + offsets) % size).T
+        mutants = self.population[a] + self.differential_weight * (self.population[b] - self.population[c])
+
+        # binomial crossover, with at least one gene taken from the mutant
+        cross = self.rng.random((size, n)) < self.crossover_rate
+        cross[np.arange(size), self.rng.integers(0, n, size)] = True
+        self.trials = np.clip(np.where(cross, mutants, self.population), 0, 1)
+        return self.decode(self.trials)
+
+    def tell(self, fitnesses):
+        """
+        Keep each trial vector that is at least as good as its target
+        :param fitnesses: sequence of floats, in the same order as the candidates
+        """
+        fitnesses = np.asarray(fitnesses, dtype=np.float64)
+        self.record(self.decode(self.trials), fitnesses)
+        if self.fitness is None:
+            self.fitness = fitnesses
+        else:
+            improved = fitnesses >= self.fitness
+            self.population[improved] = self.trials[improved]
+            self.fitness = np.where(improved, fitnesses, self.fitness)
+        self.current_generation += 1
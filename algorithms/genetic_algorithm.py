@@ -1,22 +1,60 @@
 import time
 import settings
+import metrics
 import random
 
+import numpy as np
+
+from algorithms import pareto
+from algorithms.checkpoint import (save_checkpoint, load_checkpoint, encode_population, decode_population,
+                                   encode_rng_state, decode_rng_state)
+from algorithms.convergence import ConvergenceMonitor, HISTORY_COLUMNS
+from algorithms.optimizer import Optimizer
+
 """ Implementação de um Algoritmo Genético que permite melhorar o desempenho de disparo (performance de ataque) das torres """
 
-class GeneticAlgorithm:
-    def __init__(self, tower_type):
-        self.num_generations = 40
-        self.fitness_threshold = 0.9
+# Objetivos do modo multi-objetivo (NSGA-II): inimigos travados (maximizar), custo dos atributos (minimizar)
+# e disparos efetuados (minimizar)
+OBJECTIVE_NAMES = ("stopped", "cost", "shots")
+OBJECTIVE_SENSE = np.array([1, -1, -1])
+
+class GeneticAlgorithm(Optimizer):
+    def __init__(self, tower_type, num_generations=40, population_size=20, fitness_threshold=0.9,
+                 mutation_rate=0.25, seed=None, verbose=True, initial_population=None, mode="weighted",
+                 objective_function=None, stall_generations=settings.GA_STALL_GENERATIONS,
+                 min_diversity=settings.GA_MIN_DIVERSITY, adaptive_mutation=True, level='levels/level.tmj',
+                 batch_evaluator=None):
+        super().__init__(tower_type)
+        self.mode = mode # "weighted" (fitness único) ou "nsga2" (frente de Pareto sobre vários objetivos)
+        self.num_generations = num_generations
+        self.fitness_threshold = fitness_threshold
         self.num_genes = 4  # accuracy, cooldown, range, firepower
-        self.population_size = 20 # número de torres
+        self.population_size = population_size # número de torres
+        self.mutation_rate = mutation_rate # probabilidade de mutação (por gene)
+        self.adaptive_mutation = adaptive_mutation # ajustar a taxa de mutação à estagnação e à diversidade
+        self.current_mutation_rate = mutation_rate # taxa de mutação usada na próxima geração
+        self.monitor = ConvergenceMonitor(stall_generations, min_diversity) # diagnóstico de cada geração
         self.tower_type = tower_type
-        self.population = self.initialize_population()
+        self.verbose = verbose # desativar os prints em execuções headless
+        self.seed = seed
+        self.rng = random.Random(seed) # gerador próprio para execuções reprodutíveis
+        self.custom_objective_function = objective_function # alternativa a objective_function (modo nsga2)
+        self.batch_evaluator = batch_evaluator # alternativa a fitness_function, avalia listas de indivíduos (modo weighted)
+        self.external_scores = batch_evaluator is not None # a cache tem fitness de um avaliador externo
+        self.level = level # nível cujas waves a objective_function repete por omissão
+        self.evaluator = None # simulação usada pela objective_function por omissão
+        self.offspring = [] # descendentes à espera de avaliação (modo nsga2)
+        self.fitness_cache = {} # fitness já calculados, por indivíduo
+        self.pending = [] # indivíduos devolvidos pelo ask() à espera do tell()
+        self.num_scored = 0 # avaliações feitas por esta execução (para as métricas)
+        self.last_report = (time.perf_counter(), 0) # instante e avaliações da última geração reportada
+        self.population = self.initialize_population(initial_population)
         self.current_generation = 0
 
-    def initialize_population(self):
+    def initialize_population(self, initial_population=None):
         """
         Initialize the population with random values
+        :param initial_population: list of individuals (e.g. elites of a previous run) to seed the population with
         :return: list of lists, each containing the genes for an individual
         """
         # Obter intervalos para este tipo de torre a partir das settings
@@ -25,18 +63,20 @@ class GeneticAlgorithm:
         range_min, range_max = settings.TOWER_TYPES[self.tower_type]['range'] # varia entre 50 a 100 unidades
         damage_min, damage_max = settings.TOWER_TYPES[self.tower_type]['damage'] # varia entre 1 a 3 pontos de dano 
 
-        first_population = []
+        # Warm start: manter os indivíduos dados e completar a população com indivíduos aleatórios
+        first_population = [list(ind) for ind in (initial_population or [])][:self.population_size]
 
-        for i in range(self.population_size):
+        for i in range(self.population_size - len(first_population)):
             # Inicialização aleatória dos valores de cada gene
-            accuracy = round(random.uniform( accuracy_min, accuracy_max ),2) # (inclui números decimais)
-            cooldown = random.randint(cooldown_min, cooldown_max) # (inclui números inteiros)
-            range_ = random.randint(range_min, range_max)
-            damage = random.randint(damage_min, damage_max)
+            accuracy = round(self.rng.uniform( accuracy_min, accuracy_max ),2) # (inclui números decimais)
+            cooldown = self.rng.randint(cooldown_min, cooldown_max) # (inclui números inteiros)
+            range_ = self.rng.randint(range_min, range_max)
+            damage = self.rng.randint(damage_min, damage_max)
 
             first_population.append([accuracy, cooldown, range_, damage])
 
-        print("População iniciada: ", first_population)
+        if self.verbose:
+            print("População iniciada: ", first_population)
         return first_population
 
     def fitness_function(self, individual):
@@ -73,16 +113,213 @@ class GeneticAlgorithm:
 
         fitness = round(fitness,2) # arredondar para 2 casas decimais
         
-        print(fitness)
+        if self.verbose:
+            print(fitness)
         return (fitness)
 
+    def objective_function(self, individual):
+        """
+        Calculate the objectives of an individual (nsga2 mode), see OBJECTIVE_NAMES
+        By default the waves of self.level are replayed with every tower using the individual's genes.
+        :param individual: list of genes for an individual
+        :return: tuple (fraction of enemies stopped, stat budget between 0 and 1, shots fired)
+        """
+        if self.custom_objective_function:
+            return tuple(self.custom_objective_function(individual))
+        if self.evaluator is None:
+            from game.simulation import load_level
+            from game.trajectory import WaveTrajectories, TrajectoryEvaluator
+
+            _, waypoints = load_level(self.level)
+            self.evaluator = TrajectoryEvaluator(WaveTrajectories.build(waypoints, seed=self.seed), seed=self.seed)
+        result = self.evaluator.run([individual])
+        return result["killed"] / result["total"], self.stat_budget(individual), result["shots"]
+
+    def stat_budget(self, individual):
+        """
+        Calculate how much of the tower's stat budget an individual uses
+        :param individual: list of genes for an individual
+        :return: float, 0 for the worst stats and 1 for the best ones
+        """
+        normalized = self.encode([individual])[0]
+        normalized[1] = 1 - normalized[1] # cooldown: menor é melhor
+        return float(normalized.mean())
+
+    def score(self, individual):
+        """
+        Evaluate an individual without the cache: fitness score (weighted mode) or objectives (nsga2 mode)
+        """
+        return self.score_population([individual])[0]
+
+    def score_population(self, individuals):
+        """
+        Evaluate several individuals without the cache (in a single call of the batch evaluator, if there is one)
+        :param individuals: list of individuals
+        :return: list of fitness scores (tuples of objectives in nsga2 mode)
+        """
+        if self.mode == "nsga2":
+            return [self.objective_function(ind) for ind in individuals]
+        if self.batch_evaluator:
+            return list(self.batch_evaluator(individuals))
+        return [self.fitness_function(ind) for ind in individuals]
+
+    def evaluate(self, individual):
+        """
+        Get the fitness score for an individual, using the fitness cache
+        :param individual: list of genes for an individual
+        :return: float, the fitness score (tuple of objectives in nsga2 mode)
+        """
+        key = tuple(individual)
+        fitness = self.fitness_cache.get(key)
+        if fitness is None:
+            fitness = self.score(individual)
+            self.fitness_cache[key] = fitness
+            self.num_scored += 1
+            metrics.EVALUATIONS.inc()
+        # as consultas internas não contam para a taxa de acerto da cache (só os pedidos de ask())
+        return fitness
+
+    def evaluate_population(self, individuals):
+        """
+        Get the fitness scores of several individuals, scoring the ones missing from the cache in one batch
+        :param individuals: list of individuals
+        :return: list of fitness scores (tuples of objectives in nsga2 mode)
+        """
+        missing = []
+        missing_keys = set()
+        for ind in individuals:
+            key = tuple(ind)
+            if key not in self.fitness_cache and key not in missing_keys:
+                missing_keys.add(key)
+                missing.append(ind)
+        if missing:
+            for ind, fitness in zip(missing, self.score_population(missing)):
+                self.fitness_cache[tuple(ind)] = fitness
+            self.num_scored += len(missing)
+            metrics.EVALUATIONS.inc(len(missing))
+        return [self.fitness_cache[tuple(ind)] for ind in individuals]
+
+    def average_fitness(self):
+        """
+        Get the average fitness of the population (average fraction of enemies stopped in nsga2 mode)
+        :return: float
+        """
+        fitness_scores = self.evaluate_population(self.population)
+        if self.mode == "nsga2":
+            fitness_scores = [objectives[0] for objectives in fitness_scores]
+        return sum(fitness_scores) / len(self.population)
+
+    def ask(self):
+        """
+        Get the individuals of the current population that still need a fitness score
+        :return: list of individuals (the ones already in the fitness cache are skipped)
+        """
+        self.pending = []
+        pending_keys = set()
+        for ind in self.population + self.offspring:
+            key = tuple(ind)
+            if key not in self.fitness_cache and key not in pending_keys:
+                pending_keys.add(key)
+                self.pending.append(list(ind))
+        metrics.CACHE_MISSES.inc(len(self.pending))
+        metrics.CACHE_HITS.inc(len(self.population) + len(self.offspring) - len(self.pending))
+        return [list(ind) for ind in self.pending]
+
+    def tell(self, fitnesses):
+        """
+        Receive the fitness scores of the individuals returned by ask() and create the next generation
+        :param fitnesses: sequence of floats, in the same order as the individuals
+        """
+        for ind, fitness in zip(self.pending, fitnesses):
+            self.fitness_cache[tuple(ind)] = tuple(fitness) if self.mode == "nsga2" else fitness
+        if self.mode == "nsga2":
+            self.num_evaluations += len(self.pending)
+        else:
+            self.record(self.pending, fitnesses)
+        self.num_scored += len(self.pending)
+        metrics.EVALUATIONS.inc(len(self.pending))
+        self.pending = []
+        self.update_diagnostics()
+        self.next_generation()
+        self.current_generation += 1
+
+    def update_diagnostics(self):
+        """
+        Record the diagnostics of the evaluated generation (best/mean/std fitness, diversity and stall count),
+        adapt the mutation rate and decide whether the run should stop (see stop_reason)
+        :return: dict with the diagnostics (see algorithms.convergence.HISTORY_COLUMNS)
+        """
+        individuals = self.population + self.offspring
+        fitness_scores = self.evaluate_population(individuals)
+        if self.mode == "nsga2":
+            fitness_scores = [objectives[0] for objectives in fitness_scores] # inimigos travados
+        diagnostics = self.monitor.update(self.current_generation + 1, fitness_scores, self.encode(individuals),
+                                          self.current_mutation_rate)
+        self.adapt_mutation_rate(diagnostics)
+        self.report_metrics(diagnostics)
+
+        # Parar quando não há melhorias ou quando a população colapsou (e a mutação já não a consegue recuperar)
+        if self.monitor.is_stalled():
+            self.stop_reason = "stall"
+        elif self.monitor.is_collapsed() and (not self.adaptive_mutation
+                                              or self.current_mutation_rate >= settings.GA_MAX_MUTATION_RATE):
+            self.stop_reason = "diversity"
+        return diagnostics
+
+    def report_metrics(self, diagnostics):
+        """
+        Publish the progress of the run to the metrics exporter (see metrics.py)
+        :param diagnostics: dict, diagnostics of the last generation
+        """
+        now = time.perf_counter()
+        last_time, last_scored = self.last_report
+        if now > last_time:
+            metrics.EVALUATIONS_PER_SECOND.set((self.num_scored - last_scored) / (now - last_time))
+        self.last_report = (now, self.num_scored)
+        metrics.GENERATION.set(diagnostics["generation"])
+        metrics.BEST_FITNESS.set(diagnostics["best"])
+        metrics.AVG_FITNESS.set(diagnostics["mean"])
+
+    def adapt_mutation_rate(self, diagnostics):
+        """
+        Raise the mutation rate while the run is stalled or losing diversity, and bring it back to the
+        configured rate while it is improving
+        :param diagnostics: dict, diagnostics of the last generation
+        """
+        if not self.adaptive_mutation:
+            return
+        min_diversity = self.monitor.min_diversity
+        losing_diversity = min_diversity is not None and diagnostics["diversity"] < 2 * min_diversity
+        if diagnostics["stall"] > 0 or losing_diversity:
+            self.current_mutation_rate = min(settings.GA_MAX_MUTATION_RATE, self.current_mutation_rate * 1.5)
+        else:
+            self.current_mutation_rate = max(self.mutation_rate, self.current_mutation_rate * 0.8)
+
+    def get_history(self):
+        """
+        Get the diagnostics of every generation
+        :return: list of dicts (see algorithms.convergence.HISTORY_COLUMNS)
+        """
+        return [dict(zip(HISTORY_COLUMNS, row)) for row in self.monitor.history.tolist()]
+
     def run_generation(self):
         """
         Run a single generation of the genetic algorithm
         This is where the selection, crossover, and mutation steps are performed
         """
+        candidates = self.ask()
+        self.tell(self.score_population(candidates) if candidates else [])
+
+    def next_generation(self):
+        """
+        Perform the selection, crossover and mutation steps (every individual must be in the fitness cache)
+        """
+        if self.mode == "nsga2":
+            self.next_generation_nsga2()
+            return
+
          # Calcular fitness para a população atual
-        fitness_scores = [self.fitness_function(ind) for ind in self.population]
+        fitness_scores = self.evaluate_population(self.population)
         sorted_population = [ind for _, ind in sorted(zip(fitness_scores, self.population), reverse=True)]
         
         # Selecionar os 50% melhores indivíduos como pais
@@ -93,7 +330,7 @@ class GeneticAlgorithm:
         
         # Gerar a próxima geração com crossover e mutação para cada indivíduo
         while len(next_generation) < self.population_size:
-            parent1, parent2 = random.sample(parents, 2) # Selecionar dois pais aleatórios
+            parent1, parent2 = self.rng.sample(parents, 2) # Selecionar dois pais aleatórios
             child1, child2 = self.crossover(parent1, parent2)  # Gerar dois filhos com crossover
             next_generation.append(self.mutate(child1))  # Mutar e adicionar o primeiro filho
             if len(next_generation) < self.population_size:
@@ -101,6 +338,38 @@ class GeneticAlgorithm:
 
         self.population = next_generation
 
+    def next_generation_nsga2(self):
+        """
+        NSGA-II step: keep the best fronts of parents + offspring (cut by crowding distance), then create
+        the new offspring with binary tournaments, crossover and mutation
+        """
+        # Juntar pais e descendentes (sem repetidos)
+        combined = []
+        seen = set()
+        for ind in self.population + self.offspring:
+            if tuple(ind) not in seen:
+                seen.add(tuple(ind))
+                combined.append(ind)
+
+        objectives = np.array(self.evaluate_population(combined), dtype=np.float64) * OBJECTIVE_SENSE
+        selected, ranks, distance = pareto.select(objectives, self.population_size)
+        self.population = [combined[i] for i in selected]
+
+        def tournament():
+            i = self.rng.randrange(len(self.population))
+            j = self.rng.randrange(len(self.population))
+            return i if (ranks[i], -distance[i]) <= (ranks[j], -distance[j]) else j
+
+        offspring = []
+        while len(offspring) < self.population_size:
+            parent1 = self.population[tournament()]
+            parent2 = self.population[tournament()]
+            child1, child2 = self.crossover(parent1, parent2)
+            offspring.append(self.mutate(child1))
+            if len(offspring) < self.population_size:
+                offspring.append(self.mutate(child2))
+        self.offspring = offspring
+
     def crossover(self, parent1, parent2):
         """
         Perform crossover between two parents to produce a child
@@ -110,8 +379,8 @@ class GeneticAlgorithm:
         """
 
         # Selecionar dois pontos de corte aleatórios
-        point1 = random.randint(1, self.num_genes - 2)  # Ponto de corte 1
-        point2 = random.randint(point1 + 1, self.num_genes - 1)  # Ponto de corte 2
+        point1 = self.rng.randint(1, self.num_genes - 2)  # Ponto de corte 1
+        point2 = self.rng.randint(point1 + 1, self.num_genes - 1)  # Ponto de corte 2
 
         # Criar o primeiro filho misturando os genes dos pais
         child1 = (
@@ -135,12 +404,11 @@ class GeneticAlgorithm:
         :param individual: list, the genes of the individual to mutate
         :return: list, the genes of the mutated individual
         """
-        mutation_rate = 0.25  # 25% probabilidade de mutação
-        chance = random.random()
+        mutation_rate = self.current_mutation_rate  # 25% probabilidade de mutação (por omissão), adaptada durante a execução
 
-        # mutação uniforme
+        # mutação uniforme, decidida gene a gene
         for i in range(len(individual)):
-            if chance < mutation_rate: # verifica se a chance aleatória está dentro dos 10% de chance de mutação
+            if self.rng.random() < mutation_rate: # verifica se a chance aleatória está dentro da taxa de mutação
                 # obter valores min e max para cada gene
                 range_min, range_max = settings.TOWER_TYPES[self.tower_type]['range']
                 cooldown_min, cooldown_max = settings.TOWER_TYPES[self.tower_type]['cooldown']
@@ -148,24 +416,30 @@ class GeneticAlgorithm:
 
                 # mutar o valor de cada gene
                 if i == 0:  # Accuracy
-                    individual[i] = round(random.uniform(0.1, 1.0),2)
+                    individual[i] = round(self.rng.uniform(0.1, 1.0),2)
                 elif i == 1:  # Cooldown
-                    individual[i] = random.randint(cooldown_min, cooldown_max)
+                    individual[i] = self.rng.randint(cooldown_min, cooldown_max)
                 elif i == 2:  # Range
-                    individual[i] = random.randint(range_min, range_max)
+                    individual[i] = self.rng.randint(range_min, range_max)
                 elif i == 3:  # Damage
-                    individual[i] = random.randint(damage_min, damage_max)
+                    individual[i] = self.rng.randint(damage_min, damage_max)
 
         return individual
 
-    def get_best_solution(self, num_solutions=1):
+    def get_best_solution(self, num_solutions=1, front=False, weights=None):
         """
         Get the best solution(s) from the final generation
         :param num_solutions: int, the number of best solutions to return (default is 1). Use 6 for the final solution
+        :param front: bool, nsga2 mode only: return the whole Pareto front (with the objectives of each solution)
+        :param weights: sequence of floats, nsga2 mode only: importance of each objective used to choose points on
+        the front (default: most enemies stopped first, see get_best_pareto_solution)
         :return: list of lists, the best solution(s) from the final generation. It should return 6 solutions for the 6 towers
         """
+        if self.mode == "nsga2":
+            return self.get_best_pareto_solution(num_solutions, front, weights)
+
         # Calcular fitness para a população atual
-        fitness_scores = [self.fitness_function(ind) for ind in self.population]
+        fitness_scores = self.evaluate_population(self.population)
 
         # Ordenar a população por fitness
         sorted_population = sorted(
@@ -179,6 +453,38 @@ class GeneticAlgorithm:
 
         return top_solutions, top_fitnesses
 
+    def get_best_pareto_solution(self, num_solutions=1, front=False, weights=None):
+        """
+        Get the Pareto front, or the points of the front that are best for the given objective weights
+        Without weights the solutions are ordered lexicographically: most enemies stopped first, then by front,
+        then by the balance of cost and shots. (Equal weights would favour the towers that never shoot: they
+        have the lowest cost and fire no shots, so they score 2/3 without stopping anything.)
+        :param num_solutions: int, number of solutions to return (taken from the next fronts if needed)
+        :param front: bool, return the whole Pareto front and the objectives of each solution
+        :param weights: sequence of floats, importance of each objective (default: lexicographic order)
+        :return: tuple (list of individuals, list of objective tuples if front, else the fraction of enemies
+        stopped without weights, or the weighted scores)
+        """
+        objective_values = self.evaluate_population(self.population)
+        objectives = np.array(objective_values, dtype=np.float64) * OBJECTIVE_SENSE
+        ranks = pareto.non_dominated_sort(objectives)
+        if front:
+            indices = np.flatnonzero(ranks == 0)
+            return [self.population[i] for i in indices], [objective_values[i] for i in indices]
+
+        # Normalizar cada objetivo para [0, 1] (1 = melhor) e combinar com os pesos
+        span = objectives.max(axis=0) - objectives.min(axis=0)
+        normalized = (objectives - objectives.min(axis=0)) / np.where(span > 0, span, 1)
+        if weights is None:
+            # Objetivo principal primeiro (inimigos travados); os restantes só desempatam
+            secondary = normalized[:, 1:].mean(axis=1)
+            order = np.lexsort((-secondary, ranks, -objectives[:, 0]))[:num_solutions]
+            return [self.population[i] for i in order], [float(objective_values[i][0]) for i in order]
+        weights = np.asarray(weights, dtype=np.float64)
+        scores = normalized @ (weights / weights.sum())
+        order = np.lexsort((-scores, ranks))[:num_solutions]
+        return [self.population[i] for i in order], [float(scores[i]) for i in order]
+
     def get_current_generation(self):
         """
         Get the current generation number
@@ -186,6 +492,127 @@ class GeneticAlgorithm:
         """
         return self.current_generation
 
+    def is_complete(self):
+        """
+        Check if the run has finished (max number of generations, fitness threshold reached, stalled or collapsed)
+        :return: bool
+        """
+        if self.stop_reason:
+            return True
+        avg_fitness = self.average_fitness()
+        return self.current_generation >= self.num_generations or avg_fitness >= self.fitness_threshold
+
+    def get_state(self):
+        """
+        Get the full state of the run (population, fitness cache, generation and RNG state)
+        :return: dict of numpy arrays and scalars
+        """
+        rng_version, rng_internal_state, rng_gauss_next = encode_rng_state(self.rng.getstate())
+        cache_keys = list(self.fitness_cache)
+        return {
+            "tower_type": self.tower_type,
+            "mode": self.mode,
+            "seed": -1 if self.seed is None else self.seed,
+            "num_generations": self.num_generations,
+            "population_size": self.population_size,
+            "fitness_threshold": self.fitness_threshold,
+            "mutation_rate": self.mutation_rate,
+            "current_mutation_rate": self.current_mutation_rate,
+            "stall_generations": -1 if self.monitor.stall_generations is None else self.monitor.stall_generations,
+            "min_diversity": np.nan if self.monitor.min_diversity is None else self.monitor.min_diversity,
+            "adaptive_mutation": self.adaptive_mutation,
+            "level": self.level,
+            "external_scores": self.external_scores,
+            "stop_reason": self.stop_reason or "",
+            "history": self.monitor.history,
+            "current_generation": self.current_generation,
+            "population": encode_population(self.population, self.num_genes),
+            "offspring": encode_population(self.offspring, self.num_genes),
+            "cache_keys": encode_population(cache_keys, self.num_genes),
+            "cache_values": [self.fitness_cache[key] for key in cache_keys],
+            "rng_version": rng_version,
+            "rng_internal_state": rng_internal_state,
+            "rng_gauss_next": rng_gauss_next,
+        }
+
+    def set_state(self, state):
+        """
+        Restore the state of a run saved with get_state
+        :param state: dict, as returned by get_state or load_checkpoint
+        """
+        self.current_generation = state["current_generation"]
+        self.current_mutation_rate = state.get("current_mutation_rate", self.mutation_rate)
+        self.stop_reason = state.get("stop_reason") or None
+        self.external_scores = self.external_scores or bool(state.get("external_scores", False))
+        if "history" in state:
+            self.monitor.set_history(state["history"])
+        self.population = decode_population(state["population"])
+        if "offspring" in state:
+            self.offspring = decode_population(state["offspring"])
+        cache_keys = decode_population(state["cache_keys"])
+        cache_values = state["cache_values"].tolist()
+        if self.mode == "nsga2":
+            cache_values = [tuple(value) for value in cache_values]
+        self.fitness_cache = {tuple(key): value for key, value in zip(cache_keys, cache_values)}
+        # o arquivo dos melhores indivíduos é reconstruído a partir da cache
+        self.archive = []
+        if self.mode != "nsga2":
+            self.record(cache_keys, cache_values)
+        self.num_evaluations = len(self.fitness_cache)
+        self.rng.setstate(decode_rng_state(state["rng_version"], state["rng_internal_state"],
+                                           state["rng_gauss_next"]))
+
+    def save_checkpoint(self, path):
+        """
+        Save the state of the run to a checkpoint file
+        :param path: str, path of the checkpoint (.npz)
+        """
+        save_checkpoint(path, self.get_state())
+
+    @classmethod
+    def from_checkpoint(cls, path, verbose=True, objective_function=None, batch_evaluator=None):
+        """
+        Resume a run from a checkpoint file. Running it continues exactly where the checkpoint was taken
+        :param path: str, path of the checkpoint (.npz)
+        :param verbose: bool, print progress
+        :param objective_function: custom objective function of the run (nsga2 mode), if it used one
+        :param batch_evaluator: batch evaluator of the run (weighted mode), if it used one
+        :return: GeneticAlgorithm
+        """
+        state = load_checkpoint(path)
+        seed = state.get("seed", -1)
+        stall_generations = state.get("stall_generations", settings.GA_STALL_GENERATIONS)
+        min_diversity = state.get("min_diversity", settings.GA_MIN_DIVERSITY)
+        ga = cls(state["tower_type"], num_generations=state["num_generations"],
+                 population_size=state["population_size"], fitness_threshold=state["fitness_threshold"],
+                 mutation_rate=state["mutation_rate"], verbose=verbose, seed=None if seed == -1 else seed,
+                 mode=state.get("mode", "weighted"), objective_function=objective_function,
+                 stall_generations=None if stall_generations == -1 else stall_generations,
+                 min_diversity=None if np.isnan(min_diversity) else min_diversity,
+                 adaptive_mutation=state.get("adaptive_mutation", True),
+                 level=state.get("level", 'levels/level.tmj'), batch_evaluator=batch_evaluator)
+        ga.set_state(state)
+        return ga
+
+    @classmethod
+    def warm_start(cls, previous, num_elites=settings.GA_WARM_START_ELITES, **kwargs):
+        """
+        Start a new run seeded with the elites of a previous run
+        :param previous: GeneticAlgorithm or str (path of a checkpoint) of the previous run
+        :param num_elites: int, number of best individuals to carry over
+        :param kwargs: hyperparameters of the new run (see __init__)
+        :return: GeneticAlgorithm
+        """
+        if isinstance(previous, str):
+            previous = cls.from_checkpoint(previous, verbose=False)
+        elites, _ = previous.get_best_solution(num_elites)
+        ga = cls(previous.tower_type, initial_population=elites, **kwargs)
+        # a cache só é reaproveitada quando os dois runs usam a mesma fitness
+        if (ga.mode == previous.mode and ga.level == previous.level
+                and not ga.external_scores and not previous.external_scores):
+            ga.fitness_cache.update(previous.fitness_cache)
+        return ga
+
     # def run(self):
     #     """
     #     Run the genetic algorithm for the specified number of generations.
@@ -216,31 +643,51 @@ class GeneticAlgorithm:
     #             print(f"Objetivo de média de fitness alcançado na geração {self.current_generation}!")
     #             break
 
-    def run(self):
+    def run(self, checkpoint_path=None, checkpoint_every=1):
         """
         Run the genetic algorithm for the specified number of generations.
         Stops if the average fitness score of the population >= 0.9 (until fitness threshold is reached), or the max number of generations is completed.
+        :param checkpoint_path: str, path of the checkpoint file (None to disable checkpoints)
+        :param checkpoint_every: int, number of generations between checkpoints
         """
         start_time = time.time()
         
         while self.current_generation < self.num_generations:
-            self.current_generation += 1
             self.run_generation()
             
             # Calcular a média do fitness score para a população atual
-            fitness_scores = (self.fitness_function(ind) for ind in self.population)
-            avg_fitness = sum(fitness_scores) / len(self.population)
+            avg_fitness = self.average_fitness()
 
-            print(f"Geração {self.current_generation}, Média de Fitness: {avg_fitness:.4f}")
+            if self.verbose:
+                diagnostics = self.monitor.last()
+                print(f"Geração {self.current_generation}, Média de Fitness: {avg_fitness:.4f}, "
+                      f"Melhor: {diagnostics['best']:.4f}, Desvio: {diagnostics['std']:.4f}, "
+                      f"Diversidade: {diagnostics['diversity']:.4f}, Estagnação: {int(diagnostics['stall'])}, "
+                      f"Mutação: {self.current_mutation_rate:.3f}")
+
+            reached_threshold = avg_fitness >= self.fitness_threshold
+
+            # Guardar checkpoint periodicamente (e sempre na última geração)
+            if checkpoint_path and (self.current_generation % checkpoint_every == 0 or reached_threshold
+                                    or self.stop_reason or self.current_generation == self.num_generations):
+                self.save_checkpoint(checkpoint_path)
             
             # Parar se a média do fitness score atingir ou exceder o objetivo
-            if avg_fitness >= self.fitness_threshold:
-                print(f"Objetivo de média de fitness alcançado na geração {self.current_generation}!")
+            if reached_threshold:
+                if self.verbose:
+                    print(f"Objetivo de média de fitness alcançado na geração {self.current_generation}!")
+                break
+
+            # Parar se a execução deixou de melhorar
+            if self.stop_reason:
+                if self.verbose:
+                    print(f"Execução parada na geração {self.current_generation} ({self.stop_reason})")
                 break
         
         end_time = time.time()
         delta_time = end_time - start_time
         
-        print(f"Duração {delta_time} segundos para gerar {self.current_generation} gerações.")
+        if self.verbose:
+            print(f"Duração {delta_time} segundos para gerar {self.current_generation} gerações.")
 
 
@@ -0,0 +1,152 @@
+import numpy as np
+
+import settings
+
+""" Ask/tell optimizer protocol: any (batched or parallel) evaluator can drive any optimizer """
+
+ACCURACY_BOUNDS = (0.01, 1.0)
+INTEGER_GENES = [1, 2, 3]  # cooldown, range, damage
+
+
+def gene_bounds(tower_type):
+    """
+    Get the bounds of the genes (accuracy, cooldown, range, damage) of a tower type
+    :param tower_type: str, tower type in settings.TOWER_TYPES
+    :return: tuple of numpy arrays (lower, upper)
+    """
+    tower_data = settings.TOWER_TYPES[tower_type]
+    lower, upper = zip(ACCURACY_BOUNDS, tower_data["cooldown"], tower_data["range"], tower_data["damage"])
+    return np.array(lower, dtype=np.float64), np.array(upper, dtype=np.float64)
+
+
+class Optimizer:
+    def __init__(self, tower_type, archive_size=50):
+        """
+        Base class of the optimizers
+        Each generation, ask() returns the candidates to evaluate and tell() receives their fitness
+        scores (higher is better) in the same order.
+        :param tower_type: str, tower type in settings.TOWER_TYPES
+        :param archive_size: int, number of best evaluated candidates to keep
+        """
+        self.tower_type = tower_type
+        self.lower, self.upper = gene_bounds(tower_type)
+        self.num_genes = len(self.lower)
+        self.current_generation = 0
+        self.num_evaluations = 0
+        self.archive_size = archive_size
+        self.archive = []  # (fitness, individual), best first
+        self.stop_reason = None  # set when the optimizer decides to stop early (e.g. "stall")
+
+    def ask(self):
+        """
+        Get the candidates of the current generation
+        :return: list of individuals (lists of genes) to evaluate
+        """
+        raise NotImplementedError
+
+    def tell(self, fitnesses):
+        """
+        Report the fitness scores of the candidates returned by the last ask() and advance one generation
+        :param fitnesses: sequence of floats, in the same order as the candidates
+        """
+        raise NotImplementedError
+
+    def record(self, individuals, fitnesses):
+        """
+        Count the evaluations and keep the best candidates in the archive
+        :param individuals: list of evaluated individuals
+        :param fitnesses: sequence of their fitness scores
+        """
+        self.num_evaluations += len(individuals)
+        known = {tuple(individual) for _, individual in self.archive}
+        for individual, fitness in zip(individuals, fitnesses):
+            if tuple(individual) not in known:
+                known.add(tuple(individual))
+                self.archive.append((float(fitness), list(individual)))
+        self.archive.sort(key=lambda x: x[0], reverse=True)
+        del self.archive[self.archive_size:]
+
+    def get_best_evaluated(self, num_solutions=1):
+        """
+        Get the best candidates evaluated so far
+        :param num_solutions: int, number of solutions to return
+        :return: tuple (list of individuals, list of fitness scores)
+        """
+        best = self.archive[:num_solutions]
+        return [individual for _, individual in best], [fitness for fitness, _ in best]
+
+    def get_current_generation(self):
+        """
+        Get the current generation number
+        :return: int, the current generation number
+        """
+        return self.current_generation
+
+    def decode(self, x):
+        """
+        Convert points of the unit hypercube into individuals
+        :param x: numpy array of shape (N, num_genes), values between 0 and 1
+        :return: list of individuals, with accuracy rounded to 2 decimals and the other genes to integers
+        """
+        genes = self.lower + np.clip(x, 0, 1) * (self.upper - self.lower)
+        genes[:, 0] = np.round(genes[:, 0], 2)
+        genes[:, INTEGER_GENES] = np.round(genes[:, INTEGER_GENES])
+        individuals = genes.tolist()
+        for individual in individuals:
+            for i in INTEGER_GENES:
+                individual[i] = int(individual[i])
+        return individuals
+
+    def encode(self, individuals):
+        """
+        Convert individuals into points of the unit hypercube
+        :param individuals: list of individuals
+        :return: numpy array of shape (N, num_genes)
+        """
+        genes = np.array(individuals, dtype=np.float64).reshape(-1, self.num_genes)
+        return (genes - self.lower) / (self.upper - self.lower)
+
+
+def create_optimizer(name, tower_type, population_size=20, seed=None, **kwargs):
+    """
+    Create an optimizer by name
+    :param name: str, "ga", "cmaes" or "de"
+    :param tower_type: str, tower type in settings.TOWER_TYPES
+    :param population_size: int, number of candidates per generation
+    :param seed: int, seed for the random number generator
+    :param kwargs: extra arguments of the optimizer
+    :return: Optimizer
+    """
+    if name == "ga":
+        from algorithms.genetic_algorithm import GeneticAlgorithm
+        return GeneticAlgorithm(tower_type, population_size=population_size, seed=seed, verbose=False, **kwargs)
+    if name == "cmaes":
+        from algorithms.cmaes import CMAES
+        return CMAES(tower_type, population_size=population_size, seed=seed, **kwargs)
+    if name == "de":
+        from algorithms.differential_evolution import DifferentialEvolution
+        return DifferentialEvolution(tower_type, population_size=population_size, seed=seed, **kwargs)
+    raise ValueError(f"Unknown optimizer: {name}")
+
+
+def optimize(optimizer, evaluate, num_generations, fitness_threshold=None):
+    """
+    Drive an optimizer with a batch evaluator
+    :param optimizer: Optimizer
+    :param evaluate: function that receives a list of individuals and returns their fitness scores
+    :param num_generations: int, maximum number of generations
+    :param fitness_threshold: float, stop when the average fitness of a generation reaches it, like the genetic
+    algorithm does with its population (None to disable)
+    The run also stops when the optimizer sets its stop_reason.
+    :return: tuple (best individual, best fitness)
+    """
+    for _ in range(num_generations):
+        candidates = optimizer.ask()
+        fitnesses = evaluate(candidates) if candidates else []
+        optimizer.tell(fitnesses)
+        if fitness_threshold is not None and len(fitnesses) and np.mean(fitnesses) >= fitness_threshold:
+            break
+        if optimizer.stop_reason:
+            break
+    solutions, fitnesses = optimizer.get_best_evaluated(1)
+    return solutions[0], fitnesses[0]
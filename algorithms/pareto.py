@@ -0,0 +1,85 @@
+import numpy as np
+
+""" Vectorized non-dominated sorting and crowding distance (NSGA-II), every objective is maximized """
+
+
+def dominance_matrix(objectives):
+    """
+    Calculate which points dominate which
+    :param objectives: numpy array of shape (N, M)
+    :return: boolean numpy array of shape (N, N), True at [i, j] if point i dominates point j
+    """
+    objectives = np.asarray(objectives, dtype=np.float64)
+    dominates = np.ones((len(objectives), len(objectives)), dtype=bool)
+    strictly_better = np.zeros_like(dominates)
+    # one objective at a time, to keep the temporary arrays at (N, N)
+    for column in objectives.T:
+        dominates &= column[:, None] >= column[None, :]
+        strictly_better |= column[:, None] > column[None, :]
+    return dominates & strictly_better
+
+
+def non_dominated_sort(objectives):
+    """
+    Sort points into Pareto fronts
+    :param objectives: numpy array of shape (N, M)
+    :return: numpy array of shape (N,) with the front (rank) of every point, 0 being the Pareto front
+    """
+    dominates = dominance_matrix(objectives)
+    domination_count = dominates.sum(axis=0)
+    ranks = np.full(len(dominates), -1, dtype=np.int64)
+    rank = 0
+    front = np.flatnonzero(domination_count == 0)
+    while len(front):
+        ranks[front] = rank
+        # remove the front: the points it dominates lose one dominator each
+        domination_count -= dominates[front].sum(axis=0)
+        domination_count[front] = -1
+        front = np.flatnonzero(domination_count == 0)
+        rank += 1
+    return ranks
+
+
+def crowding_distance(objectives, ranks):
+    """
+    Calculate the crowding distance of every point within its front
+    :param objectives: numpy array of shape (N, M)
+    :param ranks: numpy array of shape (N,), as returned by non_dominated_sort
+    :return: numpy array of shape (N,), infinite for the extreme points of each front
+    """
+    objectives = np.asarray(objectives, dtype=np.float64)
+    num_points, num_objectives = objectives.shape
+    distance = np.zeros(num_points)
+    for m in range(num_objectives):
+        values = objectives[:, m]
+        # sort by front, then by objective value: neighbours in a front are next to each other
+        order = np.lexsort((values, ranks))
+        sorted_values = values[order]
+        sorted_ranks = ranks[order]
+        first = np.r_[True, sorted_ranks[1:] != sorted_ranks[:-1]]
+        last = np.r_[sorted_ranks[1:] != sorted_ranks[:-1], True]
+
+        # normalize by the span of the objective in each front
+        front_min = np.minimum.reduceat(sorted_values, np.flatnonzero(first))
+        front_max = np.maximum.reduceat(sorted_values, np.flatnonzero(first))
+        span = (front_max - front_min)[np.cumsum(first) - 1]
+        span[span == 0] = 1
+
+        gap = np.zeros(num_points)
+        gap[1:-1] = (sorted_values[2:] - sorted_values[:-2]) / span[1:-1]
+        gap[first | last] = np.inf
+        distance[order] += gap
+    return distance
+
+
+def select(objectives, num_selected):
+    """
+    NSGA-II environmental selection: best fronts first, the last one cut by crowding distance
+    :param objectives: numpy array of shape (N, M)
+    :param num_selected: int, number of points to keep
+    :return: tuple (indices of the selected points, their ranks, their crowding distances)
+    """
+    ranks = non_dominated_sort(objectives)
+    distance = crowding_distance(objectives, ranks)
+    order = np.lexsort((-distance, ranks))[:num_selected]
+    return order, ranks[order], distance[order]
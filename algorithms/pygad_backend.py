@@ -0,0 +1,235 @@
+import math
+import os
+import time
+
+import numpy as np
+import pygad
+
+import metrics
+import settings
+from algorithms.checkpoint import decode_population
+from algorithms.optimizer import gene_bounds
+
+""" Alternative engine: the genetic algorithm run by pygad, with the same contract as GeneticAlgorithm """
+
+
+class BatchFitness:
+    def __init__(self, tower_type, evaluator="analytic", level='levels/level.tmj', seed=None,
+                 scenarios=settings.GA_SCENARIOS_PATH, aggregate=settings.GA_SCENARIO_AGGREGATE):
+        """
+        Picklable batch fitness function, so pygad can send it to worker processes
+        :param tower_type: str, tower type in settings.TOWER_TYPES
+        :param evaluator: str, "analytic" (GeneticAlgorithm.fitness_function), "replay" (waves replayed with
+        the trajectory cache, fraction of enemies killed) or "scenarios" (replay of every scenario)
+        :param level: str, level used by the replay evaluator
+        :param seed: int, seed of the waves and hit rolls of the replay evaluator
+        :param scenarios: str, JSON file of the scenarios evaluator (see game.scenarios.ScenarioRegistry.load)
+        :param aggregate: str, "mean" or "worst" score over the scenarios
+        """
+        self.tower_type = tower_type
+        self.evaluator = evaluator
+        self.level = level
+        self.seed = seed
+        self.scenarios = scenarios
+        self.aggregate = aggregate
+        self.function = None  # created on first use, in each process
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["function"] = None
+        return state
+
+    def evaluate_batch(self, ga_instance, solutions, solution_indices):
+        """
+        Fitness of a batch of solutions (signature required by pygad)
+        :return: list of floats
+        """
+        if self.function is None:
+            self.function = self.create_function()
+        individuals = decode_solutions(solutions)
+        metrics.EVALUATIONS.inc(len(individuals))  # in the worker process when pygad runs in parallel
+        return self.function(individuals)
+
+    def create_function(self):
+        """
+        :return: function that receives a list of individuals and returns their fitness scores
+        """
+        if self.evaluator == "scenarios":
+            from game.scenarios import ScenarioRegistry
+
+            # the scenarios of a worker process are scored in that process
+            registry = ScenarioRegistry.load(self.scenarios, seed=self.seed)
+            return lambda population: registry.score(population, self.aggregate)
+
+        if self.evaluator == "replay":
+            from game.simulation import load_level
+            from game.trajectory import WaveTrajectories, TrajectoryEvaluator
+
+            _, waypoints = load_level(self.level)
+            evaluator = TrajectoryEvaluator(WaveTrajectories.build(waypoints, seed=self.seed), seed=self.seed)
+            return lambda population: [evaluator.score([individual]) for individual in population]
+
+        from algorithms.genetic_algorithm import GeneticAlgorithm
+        fitness_function = GeneticAlgorithm(self.tower_type, population_size=0, verbose=False).fitness_function
+        return lambda population: [fitness_function(individual) for individual in population]
+
+
+def decode_solutions(solutions):
+    """
+    Convert a pygad population into individuals (accuracy with 2 decimals, integer cooldown, range and damage)
+    :param solutions: numpy array of shape (N, 4)
+    :return: list of lists of genes
+    """
+    genes = np.array(solutions, dtype=np.float64).reshape(-1, 4)
+    genes[:, 0] = np.round(genes[:, 0], 2)
+    return decode_population(genes)
+
+
+def count_evaluated(ga_instance):
+    """
+    Count the solutions of the last generation that pygad passed to the fitness function: it reuses the fitness
+    of the elites (and parents, if kept) of the previous generation
+    :param ga_instance: pygad.GA, after it scored a generation
+    :return: int
+    """
+    reused = []
+    if ga_instance.keep_elitism > 0 and ga_instance.last_generation_elitism is not None:
+        reused += [list(solution) for solution in ga_instance.last_generation_elitism]
+    if ga_instance.keep_parents != 0 and ga_instance.last_generation_parents is not None:
+        reused += [list(solution) for solution in ga_instance.last_generation_parents]
+    return sum(list(solution) not in reused for solution in ga_instance.population)
+
+
+class PyGADAlgorithm:
+    def __init__(self, tower_type, num_generations=40, population_size=20, fitness_threshold=0.9,
+                 mutation_rate=0.25, seed=None, verbose=True, initial_population=None, processes=None,
+                 evaluator="analytic", scenarios=settings.GA_SCENARIOS_PATH, aggregate=settings.GA_SCENARIO_AGGREGATE):
+        """
+        Genetic algorithm run by pygad over the genes of GeneticAlgorithm (accuracy, cooldown, range, damage),
+        with the same selection scheme: the best half of the population survives, two-point crossover and
+        per-gene random mutation within the bounds of settings.TOWER_TYPES
+        :param tower_type: str, tower type in settings.TOWER_TYPES
+        :param num_generations: int, maximum number of generations
+        :param population_size: int, number of individuals
+        :param fitness_threshold: float, stop when the average fitness of the population reaches it
+        :param mutation_rate: float, probability of mutating each gene
+        :param seed: int, seed of pygad's random generators
+        :param verbose: bool, print progress
+        :param initial_population: list of individuals to seed the population with
+        :param processes: int, worker processes used by pygad to evaluate the fitness (None or 1: no workers)
+        :param evaluator: str, "analytic", "replay" or "scenarios" (see BatchFitness)
+        :param scenarios: str, JSON file of the scenarios evaluator
+        :param aggregate: str, "mean" or "worst" score over the scenarios
+        """
+        self.tower_type = tower_type
+        self.num_generations = num_generations
+        self.population_size = population_size
+        self.fitness_threshold = fitness_threshold
+        self.mutation_rate = mutation_rate
+        self.seed = seed
+        self.verbose = verbose
+        self.processes = processes
+        self.fitness = BatchFitness(tower_type, evaluator, seed=seed, scenarios=scenarios, aggregate=aggregate)
+        self.lower, self.upper = gene_bounds(tower_type)
+        self.start_time = None
+        self.num_evaluations = 0  # solutions scored by the fitness function (counted here, not in the workers)
+
+        # genes: accuracy (2 decimals) and integer cooldown, range and damage
+        gene_space = [{"low": self.lower[0], "high": self.upper[0]}]
+        gene_space += [range(int(low), int(high) + 1) for low, high in zip(self.lower[1:], self.upper[1:])]
+
+        # the fitness is evaluated in batches, one per worker process
+        parallel_processing = None
+        batch_size = population_size
+        if processes is not None and processes != 1:
+            parallel_processing = ["process", processes]
+            batch_size = math.ceil(population_size / (processes or os.cpu_count() or 1))
+
+        self.ga_instance = pygad.GA(
+            num_generations=num_generations,
+            num_parents_mating=max(2, population_size // 2),
+            sol_per_pop=population_size,
+            num_genes=len(gene_space),
+            gene_space=gene_space,
+            gene_type=[[float, 2], int, int, int],
+            initial_population=self.initialize_population(initial_population),
+            fitness_func=self.fitness.evaluate_batch,
+            fitness_batch_size=batch_size,
+            parent_selection_type="sss",
+            keep_elitism=population_size // 2,
+            crossover_type="two_points",
+            mutation_type="random",
+            mutation_probability=mutation_rate,
+            on_generation=self.on_generation,
+            parallel_processing=parallel_processing,
+            random_seed=seed,
+            suppress_warnings=True,
+        )
+
+    def initialize_population(self, initial_population=None):
+        """
+        Build the first population: the given individuals, completed with random ones
+        :return: numpy array of shape (population_size, 4), or None to let pygad create it
+        """
+        if not initial_population:
+            return None
+        rng = np.random.default_rng(self.seed)
+        population = rng.uniform(self.lower, self.upper, (self.population_size, len(self.lower)))
+        population[:, 1:] = np.round(population[:, 1:])
+        seeds = np.array(initial_population, dtype=np.float64).reshape(-1, len(self.lower))[:self.population_size]
+        population[:len(seeds)] = seeds
+        return population
+
+    def on_generation(self, ga_instance):
+        """
+        Called by pygad after each generation: report the progress and stop at the fitness threshold
+        """
+        fitness = np.asarray(ga_instance.last_generation_fitness, dtype=np.float64)
+        avg_fitness = fitness.mean()
+        self.num_evaluations += count_evaluated(ga_instance)
+        metrics.GENERATION.set(ga_instance.generations_completed)
+        metrics.BEST_FITNESS.set(fitness.max())
+        metrics.AVG_FITNESS.set(avg_fitness)
+        if self.verbose:
+            print(f"Geração {ga_instance.generations_completed}, Média de Fitness: {avg_fitness:.4f}")
+        if avg_fitness >= self.fitness_threshold:
+            if self.verbose:
+                print(f"Objetivo de média de fitness alcançado na geração {ga_instance.generations_completed}!")
+            return "stop"
+
+    def __getstate__(self):
+        # pygad sends itself (and this callback's owner) to the worker processes: only the fitness is needed there
+        state = self.__dict__.copy()
+        state["ga_instance"] = None
+        return state
+
+    def run(self):
+        """
+        Run the genetic algorithm until the max number of generations or the fitness threshold
+        """
+        self.start_time = time.time()
+        self.num_evaluations += self.population_size  # the first population is scored whole
+        self.ga_instance.run()
+        if self.verbose:
+            print(f"Duração {time.time() - self.start_time} segundos para gerar "
+                  f"{self.get_current_generation()} gerações.")
+
+    def get_best_solution(self, num_solutions=1):
+        """
+        Get the best solution(s) from the final generation
+        :param num_solutions: int, the number of best solutions to return
+        :return: tuple (list of individuals, list of fitness scores), best first
+        """
+        population = self.ga_instance.population
+        fitness = self.ga_instance.last_generation_fitness
+        if fitness is None:
+            fitness = self.ga_instance.cal_pop_fitness()
+        order = np.argsort(-np.asarray(fitness, dtype=np.float64), kind="stable")[:num_solutions]
+        return decode_solutions(population[order]), [float(fitness[i]) for i in order]
+
+    def get_current_generation(self):
+        """
+        Get the current generation number
+        :return: int, the current generation number
+        """
+        return self.ga_instance.generations_completed
@@ -0,0 +1,242 @@
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import time
+
+import metrics
+import settings
+
+""" Hyperparameter sweeps of the genetic algorithm: trials run in a process pool, results kept in SQLite """
+
+# Espaço de procura por omissão: listas são valores a experimentar, dicionários {"low", "high"} são intervalos
+# (amostrados apenas na procura aleatória)
+DEFAULT_SPACE = {
+    "population_size": [10, 20, 40],
+    "num_generations": [40, 100],
+    "fitness_threshold": [0.9],
+    "mutation_rate": [0.1, 0.25, 0.5],
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trials (
+    id INTEGER PRIMARY KEY,
+    tower_type TEXT NOT NULL,
+    config TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    best_fitness REAL,
+    avg_fitness REAL,
+    generations INTEGER,
+    evaluations INTEGER,
+    wall_time REAL,
+    evaluations_per_second REAL,
+    stop_reason TEXT,
+    finished_at REAL,
+    UNIQUE (tower_type, config, seed)
+);
+CREATE INDEX IF NOT EXISTS trials_status ON trials (status);
+CREATE INDEX IF NOT EXISTS trials_tower_config ON trials (tower_type, config, best_fitness) WHERE status = 'done';
+"""
+
+
+def grid_search(space):
+    """
+    Get every combination of the values of a search space
+    :param space: dict, parameter name -> list of values
+    :return: list of dicts (configurations)
+    """
+    names = sorted(space)
+    for name in names:
+        if not isinstance(space[name], list):
+            raise ValueError(f"Grid search needs a list of values for {name}")
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_search(space, num_trials, seed=0):
+    """
+    Sample random configurations of a search space (the same seed always gives the same configurations)
+    :param space: dict, parameter name -> list of values, or {"low": ..., "high": ...} (integers if both bounds
+    are integers, add "log": true to sample on a log scale)
+    :param num_trials: int, number of configurations
+    :param seed: int, seed of the sampler
+    :return: list of dicts (configurations), without repeats
+    """
+    rng = random.Random(seed)
+    configs = []
+    seen = set()
+    for _ in range(num_trials * 10):  # desistir se o espaço tiver menos configurações diferentes
+        if len(configs) == num_trials:
+            break
+        config = {}
+        for name in sorted(space):
+            values = space[name]
+            if isinstance(values, list):
+                config[name] = rng.choice(values)
+            elif isinstance(values["low"], int) and isinstance(values["high"], int):
+                config[name] = rng.randint(values["low"], values["high"])
+            elif values.get("log"):
+                config[name] = values["low"] * (values["high"] / values["low"]) ** rng.random()
+            else:
+                config[name] = rng.uniform(values["low"], values["high"])
+        key = config_key(config)
+        if key not in seen:
+            seen.add(key)
+            configs.append(config)
+    return configs
+
+
+def config_key(config):
+    """
+    Get the canonical text of a configuration (same configuration, same text)
+    :param config: dict of hyperparameters
+    :return: str
+    """
+    return json.dumps(config, sort_keys=True)
+
+
+def run_trial(trial):
+    """
+    Run one genetic algorithm with the given hyperparameters (executed in the worker processes)
+    :param trial: tuple (tower_type, config key, seed)
+    :return: tuple (trial, dict with the results, increments of the metrics counters)
+    """
+    from algorithms.genetic_algorithm import GeneticAlgorithm
+
+    counters = metrics.REGISTRY.counter_values()
+    tower_type, config, seed = trial
+    start_time = time.perf_counter()
+    ga = GeneticAlgorithm(tower_type, seed=seed, verbose=False, **json.loads(config))
+    ga.run()
+    wall_time = time.perf_counter() - start_time
+    diagnostics = ga.monitor.last()
+    return trial, {
+        "best_fitness": diagnostics["best"],
+        "avg_fitness": ga.average_fitness(),
+        "generations": ga.get_current_generation(),
+        "evaluations": ga.num_evaluations,
+        "wall_time": wall_time,
+        "evaluations_per_second": ga.num_evaluations / wall_time if wall_time > 0 else None,
+        "stop_reason": ga.stop_reason,
+    }, metrics.REGISTRY.counter_deltas(counters)
+
+
+class SweepDatabase:
+    def __init__(self, path=settings.GA_SWEEP_DATABASE_PATH):
+        """
+        SQLite database with one row per trial (tower type, configuration and seed)
+        :param path: str, path of the database file
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def add_trials(self, tower_types, configs, seeds):
+        """
+        Register the trials of a sweep (trials already in the database are kept as they are)
+        :param tower_types: list of str
+        :param configs: list of dicts of hyperparameters
+        :param seeds: list of int
+        :return: list of trials (tower_type, config key, seed) of the sweep
+        """
+        trials = [(tower_type, config_key(config), seed)
+                  for tower_type in tower_types for config in configs for seed in seeds]
+        with self.connection:
+            self.connection.executemany("INSERT OR IGNORE INTO trials (tower_type, config, seed) VALUES (?, ?, ?)",
+                                        trials)
+        return trials
+
+    def pending_trials(self, trials):
+        """
+        Get the trials that still need to run (not completed, e.g. new or interrupted)
+        :param trials: list of trials (tower_type, config key, seed)
+        :return: list of trials
+        """
+        done = set(self.connection.execute("SELECT tower_type, config, seed FROM trials WHERE status = 'done'"))
+        return [trial for trial in trials if trial not in done]
+
+    def save_result(self, trial, result):
+        """
+        Store the results of a completed trial
+        :param trial: tuple (tower_type, config key, seed)
+        :param result: dict, as returned by run_trial
+        """
+        with self.connection:
+            self.connection.execute(
+                "UPDATE trials SET status = 'done', best_fitness = :best_fitness, avg_fitness = :avg_fitness, "
+                "generations = :generations, evaluations = :evaluations, wall_time = :wall_time, "
+                "evaluations_per_second = :evaluations_per_second, stop_reason = :stop_reason, "
+                "finished_at = :finished_at WHERE tower_type = :tower_type AND config = :config AND seed = :seed",
+                dict(result, finished_at=time.time(), tower_type=trial[0], config=trial[1], seed=trial[2]))
+
+    def best_configs(self, tower_type=None, limit=1):
+        """
+        Get the best configurations of each tower type (mean best fitness over the seeds, then fewest
+        generations and lowest wall time)
+        :param tower_type: str, only this tower type (default: every tower type)
+        :param limit: int, number of configurations per tower type
+        :return: list of dicts
+        """
+        if tower_type is None:
+            tower_types = [row[0] for row in self.connection.execute(
+                "SELECT DISTINCT tower_type FROM trials WHERE status = 'done' ORDER BY tower_type")]
+        else:
+            tower_types = [tower_type]
+        names = ("tower_type", "config", "trials", "best_fitness", "generations", "wall_time",
+                 "evaluations_per_second")
+        best = []
+        for tower_type in tower_types:
+            # status = 'done' e a igualdade em tower_type deixam o SQLite usar o índice parcial trials_tower_config
+            # (procura por tower_type e GROUP BY config sem ordenar as linhas)
+            rows = self.connection.execute(
+                """
+                SELECT tower_type, config, COUNT(*), AVG(best_fitness), AVG(generations), AVG(wall_time),
+                       AVG(evaluations_per_second)
+                FROM trials
+                WHERE status = 'done' AND tower_type = :tower_type
+                GROUP BY config
+                ORDER BY AVG(best_fitness) DESC, AVG(generations), AVG(wall_time), config
+                LIMIT :limit
+                """, {"tower_type": tower_type, "limit": limit})
+            best.extend(dict(zip(names, row), config=json.loads(row[1])) for row in rows)
+        return best
+
+    def close(self):
+        self.connection.close()
+
+
+def run_sweep(database, trials, processes=None, callback=None):
+    """
+    Run the trials that are not completed yet, in a process pool, saving each result as soon as it arrives
+    (an interrupted sweep continues where it stopped when it is run again)
+    :param database: SweepDatabase
+    :param trials: list of trials (tower_type, config key, seed), as returned by SweepDatabase.add_trials
+    :param processes: int, number of worker processes (default: number of CPUs, 1 runs in this process)
+    :param callback: function called with (trial, result) after each trial
+    :return: int, number of trials run
+    """
+    pending = database.pending_trials(trials)
+    if processes == 1:
+        results = map(run_trial, pending)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes)
+        results = pool.imap_unordered(run_trial, pending)
+    try:
+        for trial, result, deltas in results:
+            if pool:
+                # juntar os contadores dos workers, para o exporter deste processo ver o sweep completo
+                metrics.REGISTRY.merge_counters(deltas)
+            if result["evaluations_per_second"] is not None:
+                metrics.EVALUATIONS_PER_SECOND.set(result["evaluations_per_second"])
+            database.save_result(trial, result)
+            if callback:
+                callback(trial, result)
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+    return len(pending)
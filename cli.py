@@ -0,0 +1,371 @@
+import argparse
+import atexit
+import json
+import os
+import sys
+import time
+
+import settings
+
+""" Headless command line interface: train, sweep, simulate and bench (heavy modules are imported lazily) """
+
+
+def make_evaluator(args, tower_type):
+    """
+    Build the batch fitness function selected with --evaluator
+    :return: function that receives a list of individuals and returns their fitness scores
+    """
+    if args.evaluator == "scenarios":
+        from game.scenarios import ScenarioRegistry
+
+        registry = ScenarioRegistry.load(args.scenarios, seed=args.seed)
+        atexit.register(registry.close)
+        return lambda population: registry.score(population, args.aggregate, processes=args.processes)
+    if args.evaluator == "replay":
+        from game.simulation import load_level
+        from game.trajectory import WaveTrajectories, PopulationScorer
+
+        _, waypoints = load_level(args.level)
+        scorer = PopulationScorer(WaveTrajectories.build(waypoints, seed=args.seed), seed=args.seed,
+                                  processes=args.processes)
+        atexit.register(scorer.close)
+        return scorer.score
+
+    from algorithms.genetic_algorithm import GeneticAlgorithm
+    fitness_function = GeneticAlgorithm(tower_type, population_size=0, verbose=False).fitness_function
+    return lambda population: [fitness_function(individual) for individual in population]
+
+
+def convergence_options(args):
+    """
+    Get the early stopping and adaptive mutation options of the genetic algorithm (0 disables a criterion)
+    :return: dict of keyword arguments of GeneticAlgorithm
+    """
+    return dict(stall_generations=args.stall_generations or None, min_diversity=args.min_diversity or None,
+                adaptive_mutation=not args.fixed_mutation)
+
+
+def train_optimizer(args):
+    from algorithms.optimizer import create_optimizer, optimize
+
+    if args.resume or args.warm_start or args.checkpoint:
+        sys.exit(f"--optimizer {args.optimizer} does not support checkpoints (--resume, --warm-start, --checkpoint)")
+
+    optimizer = create_optimizer(args.optimizer, args.tower_type, population_size=args.population_size,
+                                 seed=args.seed)
+    start_time = time.perf_counter()
+    optimize(optimizer, make_evaluator(args, args.tower_type), args.generations, args.fitness_threshold)
+    delta_time = time.perf_counter() - start_time
+    top_solutions, top_fitnesses = optimizer.get_best_evaluated(args.num_solutions)
+
+    with open(args.output, "w") as file:
+        json.dump({
+            "tower_type": args.tower_type,
+            "generations": optimizer.get_current_generation(),
+            "evaluations": optimizer.num_evaluations,
+            "genomes": top_solutions,
+            "fitnesses": top_fitnesses,
+        }, file, indent=2)
+    print(f"{args.optimizer}: {optimizer.get_current_generation()} generations, {optimizer.num_evaluations} "
+          f"evaluations in {delta_time:.3f} s, best fitness {top_fitnesses[0]}, "
+          f"saved {len(top_solutions)} genomes to {args.output}")
+
+
+def train_pygad(args):
+    from algorithms.pygad_backend import PyGADAlgorithm
+
+    if args.optimizer != "ga" or args.mode != "weighted" or args.resume or args.warm_start or args.checkpoint:
+        sys.exit("--backend pygad only supports the weighted genetic algorithm, without checkpoints")
+    ga = PyGADAlgorithm(args.tower_type, num_generations=args.generations, population_size=args.population_size,
+                        fitness_threshold=args.fitness_threshold, mutation_rate=args.mutation_rate, seed=args.seed,
+                        verbose=args.verbose, processes=args.processes, evaluator=args.evaluator,
+                        scenarios=args.scenarios, aggregate=args.aggregate)
+    start_time = time.perf_counter()
+    ga.run()
+    delta_time = time.perf_counter() - start_time
+    top_solutions, top_fitnesses = ga.get_best_solution(args.num_solutions)
+
+    with open(args.output, "w") as file:
+        json.dump({
+            "tower_type": ga.tower_type,
+            "backend": "pygad",
+            "generations": ga.get_current_generation(),
+            "genomes": top_solutions,
+            "fitnesses": top_fitnesses,
+        }, file, indent=2)
+    print(f"pygad: {ga.get_current_generation()} generations in {delta_time:.3f} s, "
+          f"best fitness {top_fitnesses[0]}, saved {len(top_solutions)} genomes to {args.output}")
+
+
+def train(args):
+    from algorithms.genetic_algorithm import GeneticAlgorithm, OBJECTIVE_NAMES
+
+    if args.mode == "nsga2" and args.optimizer != "ga":
+        sys.exit("--mode nsga2 is only available with --optimizer ga")
+    if args.mode == "nsga2" and args.evaluator != "analytic":
+        sys.exit("--mode nsga2 always replays the waves of --level, --evaluator is not supported")
+    if args.backend == "pygad":
+        return train_pygad(args)
+    if args.optimizer != "ga":
+        return train_optimizer(args)
+
+    # the multi-objective mode always replays the waves, so only the weighted mode can take another evaluator
+    batch_evaluator = make_evaluator(args, args.tower_type) if args.evaluator != "analytic" else None
+    hyperparameters = dict(num_generations=args.generations, population_size=args.population_size,
+                           fitness_threshold=args.fitness_threshold, mutation_rate=args.mutation_rate,
+                           seed=args.seed, verbose=args.verbose, mode=args.mode, level=args.level,
+                           batch_evaluator=batch_evaluator, **convergence_options(args))
+    if args.resume:
+        ga = GeneticAlgorithm.from_checkpoint(args.resume, verbose=args.verbose, batch_evaluator=batch_evaluator)
+        ga.num_generations = args.generations
+    elif args.warm_start:
+        ga = GeneticAlgorithm.warm_start(args.warm_start, args.elites, **hyperparameters)
+    else:
+        ga = GeneticAlgorithm(args.tower_type, **hyperparameters)
+    start_time = time.perf_counter()
+    ga.run(checkpoint_path=args.checkpoint, checkpoint_every=args.checkpoint_every)
+    delta_time = time.perf_counter() - start_time
+    top_solutions, top_fitnesses = ga.get_best_solution(args.num_solutions)
+    output = {
+        "tower_type": ga.tower_type,
+        "generations": ga.get_current_generation(),
+        "genomes": top_solutions,
+        "fitnesses": top_fitnesses,
+        "stop_reason": ga.stop_reason,
+        "history": ga.get_history(),
+    }
+    if ga.mode == "nsga2":
+        front, objectives = ga.get_best_solution(front=True)
+        output["front"] = [dict(genome=individual, **dict(zip(OBJECTIVE_NAMES, values)))
+                           for individual, values in zip(front, objectives)]
+
+    with open(args.output, "w") as file:
+        json.dump(output, file, indent=2)
+    stop_reason = f" (stopped early: {ga.stop_reason})" if ga.stop_reason else ""
+    print(f"{ga.get_current_generation()} generations{stop_reason} in {delta_time:.3f} s, "
+          f"best fitness {top_fitnesses[0]}, saved {len(top_solutions)} genomes to {args.output}")
+
+
+def sweep(args):
+    from algorithms.sweep import DEFAULT_SPACE, SweepDatabase, grid_search, random_search, run_sweep
+
+    database = SweepDatabase(args.db)
+    if not args.best:
+        space = DEFAULT_SPACE
+        if args.space:
+            with open(args.space) as file:
+                space = json.load(file)
+        try:
+            if args.search == "grid":
+                configs = grid_search(space)
+            else:
+                configs = random_search(space, args.trials, args.search_seed)
+        except ValueError as e:  # e.g. a {"low", "high"} range with --search grid
+            args.parser.error(f"--space: {e}")
+        trials = database.add_trials(args.tower_types, configs, args.seeds)
+        pending = database.pending_trials(trials)
+        print(f"{len(trials)} trials, {len(trials) - len(pending)} already completed")
+
+        def report(trial, result):
+            tower_type, config, seed = trial
+            print(f"{tower_type} {config} seed {seed}: best fitness {result['best_fitness']:.4f}, "
+                  f"{result['generations']} generations, {result['wall_time']:.3f} s")
+
+        run_sweep(database, trials, processes=args.processes, callback=report if args.verbose else None)
+
+    for best in database.best_configs(limit=args.top):
+        print(f"{best['tower_type']}: {json.dumps(best['config'], sort_keys=True)} best fitness "
+              f"{best['best_fitness']:.4f} over {best['trials']} seeds, {best['generations']:.1f} generations, "
+              f"{best['wall_time']:.3f} s, {best['evaluations_per_second'] or 0:.0f} evaluations/s")
+    database.close()
+
+
+def simulate(args):
+    from game.simulation import load_level
+    from game.trajectory import WaveTrajectories, TrajectoryEvaluator
+
+    def report(label, result):
+        score = result["killed"] / result["total"] if result["total"] else 0.0
+        print(f"{label}: score {score:.3f}, killed {result['killed']}/{result['total']}, "
+              f"escaped {result['missed']}, health {result['health']}, waves {result['waves']}, "
+              f"shots {result['shots']}, ticks {result['ticks']}")
+        return score
+
+    with open(args.genomes) as file:
+        genomes = json.load(file)["genomes"]
+
+    if args.scenarios:
+        from game.scenarios import ScenarioRegistry
+
+        registry = ScenarioRegistry.load(args.scenarios, seed=args.seed)
+        scores = [report(name, result) for name, result in zip(registry.names, registry.run(genomes))]
+        print(f"{len(scores)} scenarios: mean score {sum(scores) / len(scores):.3f}, worst {min(scores):.3f}")
+        return
+
+    _, waypoints = load_level(args.level)
+    for i in range(args.runs):
+        seed = None if args.seed is None else args.seed + i
+        evaluator = TrajectoryEvaluator(WaveTrajectories.build(waypoints, seed=seed), seed=seed)
+        report(f"Run {i + 1}", evaluator.run(genomes))
+
+
+def bench(args):
+    from algorithms.genetic_algorithm import GeneticAlgorithm
+    from game.simulation import Simulation, load_level
+    from game.trajectory import WaveTrajectories, TrajectoryEvaluator, score_population
+
+    start_time = time.perf_counter()
+    ga = GeneticAlgorithm(args.tower_type, num_generations=args.generations, population_size=args.population_size,
+                          fitness_threshold=float("inf"), seed=args.seed, verbose=False)
+    ga.run()
+    delta_time = time.perf_counter() - start_time
+    evaluations = ga.num_evaluations
+    print(f"ga: {ga.get_current_generation()} generations in {delta_time:.3f} s "
+          f"({evaluations / delta_time:.0f} evaluations/s), best fitness {ga.get_best_solution(1)[1][0]}")
+
+    if args.backend == "pygad":
+        from algorithms.pygad_backend import PyGADAlgorithm
+
+        start_time = time.perf_counter()
+        pygad_ga = PyGADAlgorithm(args.tower_type, num_generations=args.generations,
+                                  population_size=args.population_size, fitness_threshold=float("inf"),
+                                  seed=args.seed, verbose=False, processes=args.processes)
+        pygad_ga.run()
+        delta_time = time.perf_counter() - start_time
+        evaluations = pygad_ga.num_evaluations
+        print(f"pygad: {pygad_ga.get_current_generation()} generations in {delta_time:.3f} s "
+              f"({evaluations / delta_time:.0f} evaluations/s), best fitness {pygad_ga.get_best_solution(1)[1][0]}")
+
+    _, waypoints = load_level(args.level)
+    genomes, _ = ga.get_best_solution(1)
+    seeds = [args.seed + i for i in range(args.runs)]
+    ticks = 0
+    start_time = time.perf_counter()
+    for seed in seeds:
+        ticks += Simulation(waypoints, seed=seed).run(genomes)["ticks"]
+    delta_time = time.perf_counter() - start_time
+    print(f"simulation: {args.runs} runs, {ticks} ticks in {delta_time:.3f} s ({ticks / delta_time:.0f} ticks/s)")
+
+    # the same seeds as the simulation; the trajectories are built before timing (a training run builds them once)
+    trajectories = [WaveTrajectories.build(waypoints, seed=seed) for seed in seeds]
+    ticks = 0
+    start_time = time.perf_counter()
+    for seed, seed_trajectories in zip(seeds, trajectories):
+        ticks += TrajectoryEvaluator(seed_trajectories, seed=seed).run(genomes)["ticks"]
+    delta_time = time.perf_counter() - start_time
+    print(f"trajectory replay: {args.runs} runs, {ticks} ticks in {delta_time:.3f} s "
+          f"({ticks / delta_time:.0f} ticks/s)")
+
+    start_time = time.perf_counter()
+    score_population(trajectories[0], ga.population, seed=seeds[0], processes=args.processes)
+    delta_time = time.perf_counter() - start_time
+    print(f"population replay: {len(ga.population)} individuals with {args.processes or 1} processes in "
+          f"{delta_time:.3f} s ({len(ga.population) / delta_time:.1f} evaluations/s)")
+
+
+def build_parser():
+    # options shared by every command
+    metrics_parser = argparse.ArgumentParser(add_help=False)
+    metrics_parser.add_argument("--metrics-port", type=int, default=settings.METRICS_PORT,
+                                help="serve metrics on http://127.0.0.1:PORT/metrics (Prometheus text format)")
+    metrics_parser.add_argument("--metrics-snapshot", default=settings.METRICS_SNAPSHOT_PATH,
+                                help="JSON file where a snapshot of the metrics is written periodically")
+    metrics_parser.add_argument("--metrics-interval", type=float, default=settings.METRICS_SNAPSHOT_INTERVAL)
+
+    parser = argparse.ArgumentParser(prog="pytowerr", description="pyTowerr headless tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", parents=[metrics_parser],
+                                         help="run the genetic algorithm and save the best genomes")
+    train_parser.add_argument("--tower-type", default="cannon1")
+    train_parser.add_argument("--generations", type=int, default=40)
+    train_parser.add_argument("--population-size", type=int, default=20)
+    train_parser.add_argument("--fitness-threshold", type=float, default=0.9,
+                              help="stop when the average fitness of a generation reaches this value")
+    train_parser.add_argument("--mutation-rate", type=float, default=0.25)
+    train_parser.add_argument("--stall-generations", type=int, default=settings.GA_STALL_GENERATIONS,
+                              help="stop after this many generations without improvement (0 to disable)")
+    train_parser.add_argument("--min-diversity", type=float, default=settings.GA_MIN_DIVERSITY,
+                              help="stop when the genotype diversity collapses below this value (0 to disable)")
+    train_parser.add_argument("--fixed-mutation", action="store_true", help="disable the adaptive mutation rate")
+    train_parser.add_argument("--num-solutions", type=int, default=6)
+    train_parser.add_argument("--seed", type=int, default=None)
+    train_parser.add_argument("--output", default="best_genomes.json")
+    train_parser.add_argument("--checkpoint", default=None, help="checkpoint file written during the run")
+    train_parser.add_argument("--checkpoint-every", type=int, default=1)
+    train_parser.add_argument("--resume", default=None, help="checkpoint to continue from")
+    train_parser.add_argument("--warm-start", default=None, help="checkpoint whose elites seed the new run")
+    train_parser.add_argument("--elites", type=int, default=5)
+    train_parser.add_argument("--optimizer", choices=["ga", "cmaes", "de"], default="ga")
+    train_parser.add_argument("--backend", choices=["native", "pygad"], default=settings.GA_BACKEND,
+                              help="engine of the genetic algorithm")
+    train_parser.add_argument("--evaluator", choices=["analytic", "replay", "scenarios"], default="analytic",
+                              help="fitness_function of the GA, replay of the waves (trajectory cache), "
+                                   "or replay of every scenario of --scenarios")
+    train_parser.add_argument("--mode", choices=["weighted", "nsga2"], default="weighted",
+                              help="single weighted fitness, or Pareto front of stopped enemies, cost and shots")
+    train_parser.add_argument("--level", default="levels/level.tmj")
+    train_parser.add_argument("--scenarios", default=settings.GA_SCENARIOS_PATH, help="JSON file of levels and waves")
+    train_parser.add_argument("--aggregate", choices=["mean", "worst"], default=settings.GA_SCENARIO_AGGREGATE,
+                              help="score over the scenarios: mean or worst case")
+    train_parser.add_argument("--processes", type=int, default=None)
+    train_parser.add_argument("--verbose", action="store_true")
+    train_parser.set_defaults(func=train)
+
+    sweep_parser = subparsers.add_parser("sweep", parents=[metrics_parser],
+                                         help="search the genetic algorithm hyperparameters")
+    sweep_parser.add_argument("--space", default=None,
+                              help="JSON file: parameter -> list of values, or {\"low\": ..., \"high\": ...} "
+                                   "(random search only)")
+    sweep_parser.add_argument("--search", choices=["grid", "random"], default="grid")
+    sweep_parser.add_argument("--trials", type=int, default=20, help="number of configurations (random search)")
+    sweep_parser.add_argument("--search-seed", type=int, default=0)
+    sweep_parser.add_argument("--tower-types", nargs="+", default=["cannon1"])
+    sweep_parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    sweep_parser.add_argument("--db", default=settings.GA_SWEEP_DATABASE_PATH)
+    sweep_parser.add_argument("--processes", type=int, default=None)
+    sweep_parser.add_argument("--best", action="store_true", help="only show the best configurations")
+    sweep_parser.add_argument("--top", type=int, default=1, help="configurations shown per tower type")
+    sweep_parser.add_argument("--verbose", action="store_true")
+    sweep_parser.set_defaults(func=sweep, parser=sweep_parser)
+
+    simulate_parser = subparsers.add_parser("simulate", parents=[metrics_parser],
+                                             help="score a genome file against the waves")
+    simulate_parser.add_argument("genomes", help="JSON file written by the train command")
+    simulate_parser.add_argument("--level", default="levels/level.tmj")
+    simulate_parser.add_argument("--scenarios", default=None, help="JSON file of levels and waves to play instead")
+    simulate_parser.add_argument("--runs", type=int, default=1)
+    simulate_parser.add_argument("--seed", type=int, default=None)
+    simulate_parser.set_defaults(func=simulate)
+
+    bench_parser = subparsers.add_parser("bench", parents=[metrics_parser],
+                                         help="measure genetic algorithm and simulation throughput")
+    bench_parser.add_argument("--tower-type", default="cannon1")
+    bench_parser.add_argument("--generations", type=int, default=200)
+    bench_parser.add_argument("--population-size", type=int, default=100)
+    bench_parser.add_argument("--level", default="levels/level.tmj")
+    bench_parser.add_argument("--runs", type=int, default=3)
+    bench_parser.add_argument("--seed", type=int, default=0)
+    bench_parser.add_argument("--processes", type=int, default=None)
+    bench_parser.add_argument("--backend", choices=["native", "pygad"], default=settings.GA_BACKEND,
+                              help="also measure the pygad engine with the same settings")
+    bench_parser.set_defaults(func=bench)
+
+    return parser
+
+
+def main(argv=None):
+    # never open a window or an audio device, even if pygame gets imported
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+    args = build_parser().parse_args(argv)
+    if args.metrics_port is not None or args.metrics_snapshot:
+        import metrics
+        metrics.start(args.metrics_port, args.metrics_snapshot, args.metrics_interval)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,86 +1,76 @@
-import pygame as pg
-from pygame.math import Vector2
 import math
 import settings
 
 
-class Enemy(pg.sprite.Sprite):
-    def __init__(self, enemy_type, waypoints, images):
-        pg.sprite.Sprite.__init__(self)
-        self.movement = None
-        self.target = None
+class Enemy:
+    # state only: the image is drawn by enemies.enemy_sprite.EnemySprite
+    __slots__ = ("enemy_type", "waypoints", "pos", "target_waypoint", "health", "speed", "alive")
+
+    def __init__(self, enemy_type, waypoints):
+        self.enemy_type = enemy_type
         self.waypoints = waypoints
-        self.pos = Vector2(self.waypoints[0])
+        self.pos = list(self.waypoints[0])
         self.target_waypoint = 1
         self.health = settings.ENEMY_TYPES.get(enemy_type)["health"]
         self.speed = settings.ENEMY_TYPES.get(enemy_type)["speed"]
-        self.angle = 0
-        self.original_image = images.get(enemy_type)
-        self.image = pg.transform.rotate(self.original_image, self.angle)
-        self.rect = self.image.get_rect()
-        self.rect.center = self.pos
+        self.alive = True
 
     def update(self, world):
-        self.move(world)
-        self.rotate()
-        self.check_alive(world)
-
-    def move(self, world):
-        # define a target waypoint
-        if self.target_waypoint < len(self.waypoints):
-            self.target = Vector2(self.waypoints[self.target_waypoint])
-            self.movement = self.target - self.pos
-        else:
+        """
+        Move the enemy and check if it escaped or died, updating the counters of the world
+        :return: bool, True while the enemy is still in the game
+        """
+        if self.move(world.game_speed):
             # enemy has reached the end of the path
-            self.kill()
             world.health -= 1
             world.missed_enemies += 1
+            self.alive = False
+        elif self.health <= 0:
+            world.killed_enemies += 1
+            self.alive = False
+        return self.alive
 
+    def move(self, game_speed=1):
+        """
+        Move towards the next waypoint
+        :param game_speed: int, game speed multiplier
+        :return: bool, True if the enemy reached the end of the path
+        """
+        if self.target_waypoint >= len(self.waypoints):
+            return True
         # calculate distance to target
-        dist = self.movement.length()
+        target_x, target_y = self.waypoints[self.target_waypoint]
+        x_dist = target_x - self.pos[0]
+        y_dist = target_y - self.pos[1]
+        dist = math.sqrt(x_dist ** 2 + y_dist ** 2)
+        step = self.speed * game_speed
         # check if remaining distance is greater than the enemy speed
-        if dist >= (self.speed * world.game_speed):
-            self.pos += self.movement.normalize() * (self.speed * world.game_speed)
+        if dist >= step:
+            self.pos[0] += x_dist / dist * step
+            self.pos[1] += y_dist / dist * step
         else:
-            if dist != 0:
-                self.pos += self.movement.normalize() * dist
+            self.pos[0] = target_x
+            self.pos[1] = target_y
             self.target_waypoint += 1
+        return False
 
-    def rotate(self):
-        # calculate distance to next waypoint
-        dist = self.target - self.pos
-        # use distance to calculate angle
-        self.angle = math.degrees(math.atan2(-dist[1], dist[0]))
-        # rotate image and update rectangle
-        self.image = pg.transform.rotate(self.original_image, self.angle)
-        self.rect = self.image.get_rect()
-        self.rect.center = self.pos
-
-    def check_alive(self, world):
-        if self.health <= 0:
-            world.killed_enemies += 1
-            self.kill()
+    def heading(self):
+        # angle towards the next waypoint, in degrees
+        if self.target_waypoint >= len(self.waypoints):
+            return None
+        target_x, target_y = self.waypoints[self.target_waypoint]
+        return math.degrees(math.atan2(-(target_y - self.pos[1]), target_x - self.pos[0]))
 
 
 class Warrior(Enemy):
-    def __init__(self, waypoints, images):
-        super().__init__("warrior", waypoints, images)
-        self.health = settings.ENEMY_TYPES["warrior"]["health"]
-        self.speed = settings.ENEMY_TYPES["warrior"]["speed"]
-        self.angle = 0
-        self.original_image = settings.ENEMY_TYPES["warrior"]["image"]
-        self.image = pg.transform.rotate(self.original_image, self.angle)
-        self.rect = self.image.get_rect()
-        self.rect.center = self.pos
+    __slots__ = ()
+
+    def __init__(self, waypoints):
+        super().__init__("warrior", waypoints)
 
 
 class Zombie(Enemy):
-    def __init__(self, waypoints, images):
-        super().__init__("zombie", waypoints, images)
-        self.health = settings.ENEMY_TYPES["zombie"]["health"]
-        self.speed = settings.ENEMY_TYPES["zombie"]["speed"]
-        self.angle = 0
-        self.original_image = settings.ENEMY_TYPES["zombie"]["image"]
-        self.image = pg.transform.rotate(self.original_image, self.angle)
-        self.rect = self.image.get_rect()
-        self.rect.center = self.pos
+    __slots__ = ()
+
+    def __init__(self, waypoints):
+        super().__init__("zombie", waypoints)
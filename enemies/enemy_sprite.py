@@ -0,0 +1,28 @@
+import pygame as pg
+
+
+class EnemySprite(pg.sprite.Sprite):
+    # render adapter of an enemies.enemy.Enemy: only needed when the game is drawn
+    def __init__(self, enemy, images):
+        pg.sprite.Sprite.__init__(self)
+        self.enemy = enemy
+        self.angle = 0
+        self.original_image = images.get(enemy.enemy_type)
+        self.image = self.original_image
+        self.rect = self.image.get_rect(center=enemy.pos)
+
+    def update(self):
+        if not self.enemy.alive:
+            self.kill()
+            return
+        self.rotate()
+
+    def rotate(self):
+        # use the direction to the next waypoint to calculate the angle
+        angle = self.enemy.heading()
+        if angle is not None and angle != self.angle:
+            self.angle = angle
+            # rotate image
+            self.image = pg.transform.rotate(self.original_image, self.angle)
+        # update rectangle
+        self.rect = self.image.get_rect(center=self.enemy.pos)
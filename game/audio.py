@@ -0,0 +1,67 @@
+import math
+import os
+
+import pygame as pg
+
+import settings
+
+
+class AudioManager:
+    def __init__(self, sound_path='assets/audio/shot.wav', volume=0.5, num_channels=settings.AUDIO_CHANNELS,
+                 window=settings.AUDIO_COALESCE_WINDOW, mute_speed=settings.AUDIO_MUTE_SPEED):
+        """
+        Play shot sounds from one shared buffer on a bounded pool of reserved channels
+        Shots requested within `window` ms are coalesced into a single play, louder for bigger bursts.
+        :param sound_path: str, path of the shot sound
+        :param volume: float, volume of a single shot
+        :param num_channels: int, number of mixer channels reserved for shots
+        :param window: int, coalescing window, in ms
+        :param mute_speed: int, game speeds above this value are muted
+        """
+        self.volume = volume
+        self.window = window
+        self.mute_speed = mute_speed
+        self.pending_shots = 0
+        self.window_start = 0
+        self.next_channel = 0
+        self.channels = []
+        self.sound = None
+
+        # headless runs (no mixer or a dummy audio driver) never touch the mixer
+        self.enabled = pg.mixer.get_init() is not None and os.environ.get("SDL_AUDIODRIVER") != "dummy"
+        if self.enabled:
+            self.sound = pg.mixer.Sound(sound_path)
+            if pg.mixer.get_num_channels() < num_channels:
+                pg.mixer.set_num_channels(num_channels)
+            pg.mixer.set_reserved(num_channels)
+            self.channels = [pg.mixer.Channel(i) for i in range(num_channels)]
+
+    def shot(self, current_time):
+        """
+        Register a shot to be played with the next coalesced burst
+        :param current_time: int, current time in ms
+        """
+        if not self.enabled:
+            return
+        if self.pending_shots == 0:
+            self.window_start = current_time
+        self.pending_shots += 1
+
+    def update(self, current_time, game_speed=1):
+        """
+        Play the pending shots once their coalescing window has closed
+        :param current_time: int, current time in ms
+        :param game_speed: int, game speed multiplier (fast speeds are muted)
+        """
+        if self.pending_shots == 0 or current_time - self.window_start < self.window:
+            return
+        count = self.pending_shots
+        self.pending_shots = 0
+        if game_speed > self.mute_speed:
+            return
+
+        # loudness grows with the square root of the number of coalesced shots
+        channel = self.channels[self.next_channel]
+        self.next_channel = (self.next_channel + 1) % len(self.channels)
+        channel.set_volume(min(1.0, self.volume * math.sqrt(count)))
+        channel.play(self.sound)
@@ -1,13 +1,17 @@
+import os
 import threading
 
 import pygame as pg
 import json
 
 from enemies.enemy import Zombie, Warrior
+from enemies.enemy_sprite import EnemySprite
 from game.world import World
 from game.button import Button
+from game.audio import AudioManager
 from algorithms.genetic_algorithm import GeneticAlgorithm
 
+import metrics
 import settings
 
 
@@ -18,7 +22,6 @@ class Game:
     game_outcome = 0  # -1 the user loses & 1 the user wins
     level_started = False
     last_enemy_spawn = pg.time.get_ticks()
-    tower_spritesheets = []
     world = None
     world_data = None
     map_image = None
@@ -54,8 +57,11 @@ class Game:
         self.text_font = pg.font.SysFont("Consolas", 24, bold=True)
         self.large_font = pg.font.SysFont("Consolas", 36)
 
+        # shared shot sounds
+        self.audio = AudioManager()
+
         # create world
-        self.world = World(self.world_data, self.map_image)
+        self.world = World(self.world_data, self.map_image, self.audio)
         self.world.process_data()
         self.world.process_enemies()
 
@@ -114,7 +120,7 @@ class Game:
         self.ga_train_button_active = True
         self.wave_number_text = 0
         self.last_enemy_spawn = pg.time.get_ticks()
-        self.world = World(self.world_data, self.map_image)
+        self.world = World(self.world_data, self.map_image, self.audio)
         self.world.process_data()
         self.world.process_enemies()
         self.enemy_group.empty()
@@ -129,8 +135,12 @@ class Game:
     def run_ga(self):
         # Assuming a way to determine the tower type (typically from world.towers)
         first_tower_type = self.world.towers[0].tower_type
-        self.ga_instance = GeneticAlgorithm(first_tower_type)
-        self.ga_instance.run()
+        if settings.GA_BACKEND == "pygad":
+            from algorithms.pygad_backend import PyGADAlgorithm
+            self.ga_instance = PyGADAlgorithm(first_tower_type)
+            self.ga_instance.run()
+        else:
+            self.run_native_ga(first_tower_type)
         self.ga_running = False
         top_solutions, top_fitnesses = self.ga_instance.get_best_solution(6)  # Retrieve top 6 solutions
         # Update total fitness score for all towers
@@ -142,6 +152,25 @@ class Game:
         # Update the tower strategies with the top solutions
         self.update_tower_strategies(top_solutions)
 
+    def run_native_ga(self, tower_type):
+        checkpoint_path = settings.GA_CHECKPOINT_PATH.format(tower_type=tower_type)
+        # Continue the previous run (in memory, or the checkpoint left by an earlier session) if it was
+        # interrupted, otherwise start a new run seeded with its elites
+        previous = self.ga_instance
+        if not isinstance(previous, GeneticAlgorithm) or previous.tower_type != tower_type:
+            previous = None
+            if os.path.exists(checkpoint_path):
+                previous = GeneticAlgorithm.from_checkpoint(checkpoint_path)
+        if previous is None or previous.tower_type != tower_type:
+            self.ga_instance = GeneticAlgorithm(tower_type, mode=settings.GA_MODE)
+        elif previous.is_complete() or previous.mode != settings.GA_MODE or previous.external_scores:
+            # a run scored another way (other mode, or a batch evaluator of the CLI) is not resumed, its
+            # fitness values do not mean the same as the game's; its elites only seed the new run
+            self.ga_instance = GeneticAlgorithm.warm_start(previous, mode=settings.GA_MODE)
+        else:
+            self.ga_instance = previous
+        self.ga_instance.run(checkpoint_path=checkpoint_path)
+
     def update_tower_strategies(self, top_solutions):
         self.generation_number = self.ga_instance.get_current_generation()
         # Update the strategy parameters for each tower
@@ -152,7 +181,7 @@ class Game:
     def run(self):
         run = True
         while run:
-            self.clock.tick(settings.FPS)
+            metrics.FRAME_TIME.observe(self.clock.tick(settings.FPS))
 
             if not self.game_over:
                 # check if player has lost
@@ -164,20 +193,22 @@ class Game:
                     self.game_over = True
                     self.game_outcome = 1  # win
 
-                # update groups
-                self.enemy_group.update(self.world)
-                # self.world.tower_group.update(self.enemy_group, self.world)
+                # update game state
+                self.world.update_enemies()
                 current_time = pg.time.get_ticks()
-                for tower in self.world.tower_group:
-                    tower.update(self.enemy_group, current_time, self.world)
+                for tower in self.world.towers:
+                    tower.update(self.world.enemies, current_time, self.world)
+                self.world.projectiles.update(self.world.enemies, self.world.game_speed)
+                self.audio.update(current_time, self.world.game_speed)
 
                 # draw world
                 self.world.draw(self.screen)
 
                 # draw groups
+                self.enemy_group.update()
                 self.enemy_group.draw(self.screen)
-                for tower in self.world.tower_group:
-                    tower.draw(self.screen)
+                self.world.draw_towers(self.screen, current_time)
+                self.world.draw_projectiles(self.screen)
 
                 # display info
                 self.display_data()
@@ -210,10 +241,11 @@ class Game:
                         if self.world.spawned_enemies < len(self.world.enemy_list):
                             enemy_type = self.world.enemy_list[self.world.spawned_enemies]
                             if enemy_type == "zombie":
-                                enemy = Zombie(self.world.waypoints, self.enemy_images)
+                                enemy = Zombie(self.world.waypoints)
                             elif enemy_type == "warrior":
-                                enemy = Warrior(self.world.waypoints, self.enemy_images)
-                            self.enemy_group.add(enemy)
+                                enemy = Warrior(self.world.waypoints)
+                            self.world.enemies.append(enemy)
+                            self.enemy_group.add(EnemySprite(enemy, self.enemy_images))
                             self.world.spawned_enemies += 1
                             self.last_enemy_spawn = pg.time.get_ticks()
 
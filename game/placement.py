@@ -0,0 +1,292 @@
+import math
+
+import numpy as np
+
+import settings
+
+""" Tower placement optimizer built on a precomputed path-coverage map of the tile grid """
+
+
+def buildable_tiles(tile_map, cols=settings.COLS):
+    """
+    Find the tiles where a tower can be built
+    :param tile_map: list of tile ids, as read from the "tilemap" layer of the level (row-major)
+    :param cols: int, number of columns in the tile grid
+    :return: numpy array of shape (K, 2) with the (tile_x, tile_y) of every buildable tile
+    """
+    tiles = np.asarray(tile_map, dtype=np.int32)
+    indices = np.flatnonzero(np.isin(tiles, settings.BUILDABLE_TILES))
+    return np.stack((indices % cols, indices // cols), axis=1)
+
+
+def path_intervals(waypoints, centers, radii):
+    """
+    Find the stretch of every path segment that lies inside each circle
+    The intersection of every segment with every circle is solved in closed form, for all
+    centers and radii at once.
+    :param waypoints: sequence of (x, y) points of the path
+    :param centers: array of shape (K, 2) with the circle centers, in pixels
+    :param radii: array of shape (R,) with the circle radii, in pixels
+    :return: tuple (enter, exit), numpy arrays of shape (K, R, M) with the distance along the path (pixels from the
+    first waypoint) where each segment enters and leaves each circle; enter == exit if it does not cross it
+    """
+    points = np.asarray(waypoints, dtype=np.float64)
+    start = points[:-1]
+    direction = points[1:] - start
+    seg_len_sq = np.einsum("ij,ij->i", direction, direction)
+    seg_len = np.sqrt(seg_len_sq)
+    seg_start = np.concatenate(([0.0], np.cumsum(seg_len)[:-1]))
+    keep = seg_len_sq > 0
+    start, direction, seg_len_sq = start[keep], direction[keep], seg_len_sq[keep]
+    seg_len, seg_start = seg_len[keep], seg_start[keep]
+
+    # |start + t * direction - center|^2 = r^2  ->  a*t^2 + b*t + c = 0
+    offset = start[None, :, :] - np.asarray(centers, dtype=np.float64)[:, None, :]  # (K, M, 2)
+    b = 2 * np.einsum("kmj,mj->km", offset, direction)  # (K, M)
+    c = np.einsum("kmj,kmj->km", offset, offset)  # (K, M)
+    r_sq = np.asarray(radii, dtype=np.float64) ** 2  # (R,)
+
+    a = seg_len_sq[None, None, :]
+    disc = b[:, None, :] ** 2 - 4 * a * (c[:, None, :] - r_sq[None, :, None])  # (K, R, M)
+    sqrt_disc = np.sqrt(np.maximum(disc, 0))
+    t_enter = np.clip((-b[:, None, :] - sqrt_disc) / (2 * a), 0, 1)
+    t_exit = np.where(disc > 0, np.clip((-b[:, None, :] + sqrt_disc) / (2 * a), 0, 1), t_enter)
+    return seg_start + t_enter * seg_len, seg_start + t_exit * seg_len
+
+
+def path_coverage(waypoints, centers, radii):
+    """
+    Calculate the length of the path (polyline) that lies inside each circle (see path_intervals)
+    :param waypoints: sequence of (x, y) points of the path
+    :param centers: array of shape (K, 2) with the circle centers, in pixels
+    :param radii: array of shape (R,) with the circle radii, in pixels
+    :return: numpy array of shape (K, R) with the covered path length, in pixels
+    """
+    enter, exit_ = path_intervals(waypoints, centers, radii)
+    return (exit_ - enter).sum(axis=2)
+
+
+def closest_points(waypoints, centers):
+    """
+    Find the point of the path closest to each center
+    :param waypoints: sequence of (x, y) points of the path
+    :param centers: array of shape (K, 2), in pixels
+    :return: numpy array of shape (K, 2)
+    """
+    points = np.asarray(waypoints, dtype=np.float64)
+    start = points[:-1]
+    direction = points[1:] - start
+    seg_len_sq = np.maximum(np.einsum("ij,ij->i", direction, direction), 1e-12)
+    centers = np.asarray(centers, dtype=np.float64)[:, None, :]
+    # projection of each center on each segment, clipped to the segment
+    t = np.clip(np.einsum("kmj,mj->km", centers - start, direction) / seg_len_sq, 0, 1)
+    closest = start + t[..., None] * direction  # (K, M, 2)
+    distances = np.einsum("kmj,kmj->km", closest - centers, closest - centers)
+    return closest[np.arange(len(closest)), distances.argmin(axis=1)]
+
+
+class CoverageMap:
+    def __init__(self, tile_map, waypoints, cols=settings.COLS, range_step=1):
+        """
+        Precompute the path coverage of every buildable tile for every candidate range
+        :param tile_map: list of tile ids of the level (World.tile_map)
+        :param waypoints: list of (x, y) points of the enemy path (World.waypoints)
+        :param cols: int, number of columns in the tile grid
+        :param range_step: int, spacing between the candidate ranges of each tower type
+        """
+        self.tiles = buildable_tiles(tile_map, cols)
+        self.centers = (self.tiles + 0.5) * settings.TILE_SIZE
+        self.waypoints = np.asarray(waypoints, dtype=np.float64)
+        self.path_length = float(np.hypot(*np.diff(self.waypoints, axis=0).T).sum())
+
+        # stretches of path inside every (tile, range) and their total length, per tower type
+        self.ranges = {}
+        self.intervals = {}
+        self.coverage = {}
+        for tower_type, tower_data in settings.TOWER_TYPES.items():
+            range_min, range_max = tower_data["range"]
+            self.ranges[tower_type] = np.arange(range_min, range_max + 1, range_step)
+            enter, exit_ = path_intervals(self.waypoints, self.centers, self.ranges[tower_type])
+            self.intervals[tower_type] = (enter, exit_)
+            self.coverage[tower_type] = (exit_ - enter).sum(axis=2)
+
+    def range_column(self, tower_type, range_):
+        # index of the precomputed candidate closest to range_
+        return int(np.abs(self.ranges[tower_type] - range_).argmin())
+
+    def coverage_length(self, tower_type, range_):
+        """
+        Get the covered path length of every buildable tile for a given range
+        :param tower_type: str, tower type in settings.TOWER_TYPES
+        :param range_: int, tower range (the closest precomputed candidate is used)
+        :return: numpy array of shape (K,)
+        """
+        return self.coverage[tower_type][:, self.range_column(tower_type, range_)]
+
+    def coverage_pieces(self, tower_type, range_):
+        """
+        Split the path where it enters or leaves the range of a tile, so every piece is either covered whole by
+        a tile or not at all; mask @ lengths is then coverage_length
+        :param tower_type: str, tower type in settings.TOWER_TYPES
+        :param range_: int, tower range (the closest precomputed candidate is used)
+        :return: tuple (mask, lengths), boolean numpy array of shape (K, P) with the pieces each tile covers, and
+        the length of each piece (P,)
+        """
+        column = self.range_column(tower_type, range_)
+        enter, exit_ = (bounds[:, column] for bounds in self.intervals[tower_type])  # (K, M)
+        crossed = exit_ > enter
+        bounds = np.unique(np.concatenate(([0.0, self.path_length], enter[crossed], exit_[crossed])))
+        middle = (bounds[:-1] + bounds[1:]) / 2
+        mask = ((enter[:, :, None] < middle) & (middle < exit_[:, :, None])).any(axis=1)
+        return mask, np.diff(bounds)
+
+    def tower_positions(self, layout, tower_type):
+        """
+        Convert a layout into entries with the same format as settings.TOWER_POSITIONS
+        Each tower faces the closest point of the path.
+        :param layout: sequence of buildable tile indices
+        :param tower_type: str, tower type in settings.TOWER_TYPES
+        :return: list of dicts with id, type, x, y and angle
+        """
+        layout = np.asarray(layout)
+        closest = closest_points(self.waypoints, self.centers[layout])
+        positions = []
+        for tower_id, index in enumerate(layout):
+            x_dist, y_dist = closest[tower_id] - self.centers[index]
+            positions.append({
+                "id": tower_id,
+                "type": tower_type,
+                "x": int(self.tiles[index, 0]),
+                "y": int(self.tiles[index, 1]),
+                "angle": round(math.degrees(math.atan2(-y_dist, x_dist))),
+            })
+        return positions
+
+
+class PlacementOptimizer:
+    def __init__(self, coverage_map, tower_type, range_, num_towers=len(settings.TOWER_POSITIONS), saturation=1,
+                 seed=None):
+        """
+        Choose the tiles of N towers so that the covered path length is maximized
+        Each piece of path counts at most `saturation` times, so stacking towers on the same stretch of
+        path has diminishing returns.
+        :param coverage_map: CoverageMap of the level
+        :param tower_type: str, tower type in settings.TOWER_TYPES
+        :param range_: int, range of the towers, in pixels (the closest precomputed candidate is used)
+        :param num_towers: int, number of towers to place
+        :param saturation: int, number of towers after which a piece of path stops adding to the score
+        :param seed: int, seed for the random number generator (genetic search)
+        """
+        self.coverage_map = coverage_map
+        # the pieces of path each tile covers, from the closed-form coverage index
+        self.mask, self.weights = coverage_map.coverage_pieces(tower_type, range_)
+        self.num_candidates = len(coverage_map.tiles)
+        self.num_towers = min(num_towers, self.num_candidates)
+        self.saturation = saturation
+        self.rng = np.random.default_rng(seed)
+
+    def score(self, layouts):
+        """
+        Calculate the (saturated) covered path length of one or many layouts
+        :param layouts: array of shape (N,) or (P, N) with buildable tile indices
+        :return: float, or numpy array of shape (P,)
+        """
+        layouts = np.asarray(layouts)
+        counts = self.mask[layouts].sum(axis=-2)
+        return np.minimum(counts, self.saturation) @ self.weights
+
+    def marginal_gains(self, counts):
+        """
+        Calculate how much each candidate tile would add to a layout
+        :param counts: array of shape (S,), number of towers covering each piece of path
+        :return: numpy array of shape (K,)
+        """
+        open_weights = np.where(counts < self.saturation, self.weights, 0)
+        return self.mask @ open_weights
+
+    def greedy(self):
+        """
+        Build a layout by repeatedly adding the tile with the largest marginal gain
+        :return: numpy array with the chosen tile indices
+        """
+        counts = np.zeros(self.mask.shape[1], dtype=np.int32)
+        layout = []
+        for _ in range(self.num_towers):
+            gains = self.marginal_gains(counts)
+            gains[layout] = -1
+            best = int(gains.argmax())
+            layout.append(best)
+            counts += self.mask[best]
+        return np.array(layout)
+
+    def local_search(self, layout, max_rounds=50):
+        """
+        Improve a layout by moving single towers to the best free tile until no move helps
+        :param layout: sequence of tile indices to start from
+        :param max_rounds: int, maximum number of passes over the towers
+        :return: numpy array with the improved tile indices
+        """
+        layout = np.array(layout)
+        counts = self.mask[layout].sum(axis=0)
+        current = self.score(layout)
+        for _ in range(max_rounds):
+            improved = False
+            for i in range(len(layout)):
+                # remove tower i and look for the best tile to put it back in
+                counts -= self.mask[layout[i]]
+                gains = self.marginal_gains(counts)
+                gains[layout] = -1
+                best = int(gains.argmax())
+                candidate = np.minimum(counts, self.saturation) @ self.weights + gains[best]
+                if candidate > current + 1e-9:
+                    layout[i] = best
+                    current = candidate
+                    improved = True
+                counts += self.mask[layout[i]]
+            if not improved:
+                break
+        return layout
+
+    def genetic(self, population_size=60, num_generations=100, mutation_rate=0.2, initial_layouts=()):
+        """
+        Search layouts with a genetic algorithm, scoring the whole population at once
+        :param population_size: int, number of layouts per generation
+        :param num_generations: int, number of generations
+        :param mutation_rate: float, probability of moving each tower to a random tile
+        :param initial_layouts: sequence of layouts to seed the first population with
+        :return: numpy array with the tile indices of the best layout found
+        """
+        population = np.array([self.rng.choice(self.num_candidates, self.num_towers, replace=False)
+                               for _ in range(population_size)])
+        for i, layout in enumerate(initial_layouts):
+            population[i % population_size] = layout
+
+        for _ in range(num_generations):
+            fitness = self.score(population)
+            parents = population[np.argsort(fitness)[::-1][:population_size // 2]]
+            children = []
+            while len(parents) + len(children) < population_size:
+                parent1, parent2 = parents[self.rng.choice(len(parents), 2, replace=False)]
+                # the child takes its towers from the tiles used by both parents
+                pool = np.unique(np.concatenate((parent1, parent2)))
+                child = self.rng.choice(pool, self.num_towers, replace=False)
+                for j in np.flatnonzero(self.rng.random(self.num_towers) < mutation_rate):
+                    free = np.setdiff1d(np.arange(self.num_candidates), child)
+                    child[j] = self.rng.choice(free)
+                children.append(child)
+            population = np.concatenate((parents, children))
+
+        return population[self.score(population).argmax()]
+
+    def optimize(self, method="local"):
+        """
+        Find a tower layout
+        :param method: str, "greedy", "local" (greedy + local search) or "genetic" (seeded GA + local search)
+        :return: numpy array with the chosen tile indices
+        """
+        layout = self.greedy()
+        if method == "greedy":
+            return layout
+        if method == "genetic":
+            layout = self.genetic(initial_layouts=[layout])
+        return self.local_search(layout)
@@ -0,0 +1,255 @@
+import json
+import math
+import os
+from multiprocessing import Pool
+
+import numpy as np
+
+import metrics
+import settings
+from game.placement import CoverageMap, PlacementOptimizer
+from game.simulation import load_level
+from game.trajectory import WaveTrajectories, TrajectoryEvaluator
+
+""" Registry of levels and wave specs, loaded once, used to score genomes over many scenarios """
+
+AGGREGATES = {
+    "mean": np.mean,  # average score over the scenarios
+    "worst": np.min,  # score of the hardest scenario
+}
+
+
+class Scenario:
+    def __init__(self, name, level, waypoints, spawn_data, tower_positions, seed):
+        """
+        A level played with a wave spec: the map is parsed and the trajectories of the waves precomputed
+        :param name: str, unique name in the registry
+        :param level: str, path of the Tiled JSON map
+        :param waypoints: list of (x, y) points of the enemy path
+        :param spawn_data: list of waves
+        :param tower_positions: list of tower entries (see settings.TOWER_POSITIONS)
+        :param seed: int, seed for the wave order and the hit rolls
+        """
+        self.name = name
+        self.level = level
+        self.waypoints = waypoints
+        self.spawn_data = spawn_data
+        self.tower_positions = tower_positions
+        self.seed = seed
+        self.trajectories = WaveTrajectories.build(waypoints, spawn_data, seed)
+
+    def evaluator(self, trajectories=None):
+        """
+        :param trajectories: WaveTrajectories to replay (default the ones of the scenario)
+        :return: TrajectoryEvaluator of the scenario
+        """
+        return TrajectoryEvaluator(self.trajectories if trajectories is None else trajectories,
+                                   self.tower_positions, self.seed)
+
+
+_worker_evaluators = []
+
+
+def _init_worker(scenarios):
+    # one evaluator per scenario, replaying the trajectories shared by the registry
+    _worker_evaluators[:] = [TrajectoryEvaluator(WaveTrajectories.attach(handle), tower_positions, seed)
+                             for handle, tower_positions, seed in scenarios]
+
+
+def _score_chunk(task):
+    scenario_index, start, individuals = task
+    evaluator = _worker_evaluators[scenario_index]
+    counters = metrics.REGISTRY.counter_values()
+    scores = [evaluator.score([individual]) for individual in individuals]
+    return scenario_index, start, scores, metrics.REGISTRY.counter_deltas(counters)
+
+
+class ScenarioRegistry:
+    def __init__(self):
+        """
+        Scenarios kept in memory for the whole run (use ScenarioRegistry.load or add)
+        """
+        self.scenarios = []
+        self.levels = {}  # path -> (tile_map, waypoints), every level is parsed once
+        self.placements = {}  # path -> tower entries placed automatically on the level
+        self.evaluators = None  # evaluators of this process, created on first use
+        self.pool = None  # worker processes, kept between evaluations
+        self.processes = None
+        self.shared = []  # shared copies of the trajectories used by the workers
+
+    @classmethod
+    def load(cls, path=settings.GA_SCENARIOS_PATH, seed=None):
+        """
+        Load the scenarios of a JSON file: a list of specs with name, level, and optionally waves (default
+        settings.ENEMY_SPAWN_DATA), tower_positions (default settings.TOWER_POSITIONS, "auto" to place the towers
+        on the level, see place_towers) and seeds (one scenario per seed, named name/seed)
+        :param path: str, path of the JSON file
+        :param seed: int, seed of the specs without seeds, and offset added to the seeds of the other specs
+        (so every --seed plays other wave orders and hit rolls); None keeps the seeds of the file
+        :return: ScenarioRegistry
+        """
+        with open(path) as file:
+            specs = json.load(file)
+        registry = cls()
+        for spec in specs:
+            seeds = spec.get("seeds", [None])
+            for spec_seed in seeds:
+                name = spec["name"] if len(seeds) == 1 else f"{spec['name']}/{spec_seed}"
+                if spec_seed is None:
+                    scenario_seed = seed
+                else:
+                    scenario_seed = spec_seed if seed is None else spec_seed + seed
+                registry.add(name, spec.get("level", 'levels/level.tmj'), spec.get("waves"),
+                             spec.get("tower_positions"), scenario_seed)
+        return registry
+
+    def add(self, name, level='levels/level.tmj', spawn_data=None, tower_positions=None, seed=None):
+        """
+        Register a scenario
+        :param name: str, unique name
+        :param level: str, path of the Tiled JSON map
+        :param spawn_data: list of waves (default settings.ENEMY_SPAWN_DATA)
+        :param tower_positions: list of tower entries (default settings.TOWER_POSITIONS), or "auto" to place the
+        towers of settings.TOWER_POSITIONS where they cover the most path of the level
+        :param seed: int, seed for the wave order and the hit rolls
+        :return: Scenario
+        """
+        if any(scenario.name == name for scenario in self.scenarios):
+            raise ValueError(f"Duplicate scenario name: {name}")
+        if self.pool is not None:
+            self.close()  # the workers only know the scenarios they were started with
+        key = os.path.normpath(level)
+        if key not in self.levels:
+            self.levels[key] = load_level(level)
+        tile_map, waypoints = self.levels[key]
+        if tower_positions is None:
+            tower_positions = settings.TOWER_POSITIONS
+        elif tower_positions == "auto":
+            if key not in self.placements:
+                self.placements[key] = place_towers(tile_map, waypoints)
+            tower_positions = self.placements[key]
+        scenario = Scenario(name, level, waypoints, settings.ENEMY_SPAWN_DATA if spawn_data is None else spawn_data,
+                            tower_positions, seed)
+        self.scenarios.append(scenario)
+        self.evaluators = None
+        return scenario
+
+    def __len__(self):
+        return len(self.scenarios)
+
+    def __iter__(self):
+        return iter(self.scenarios)
+
+    @property
+    def names(self):
+        return [scenario.name for scenario in self.scenarios]
+
+    def run(self, genomes):
+        """
+        Play every scenario with the given tower genomes
+        :param genomes: list of [accuracy, cooldown, range, damage], assigned to the towers in turn
+        :return: list of result dicts of TrajectoryEvaluator.run, one per scenario
+        """
+        return [evaluator.run(genomes) for evaluator in self.get_evaluators()]
+
+    def get_evaluators(self):
+        if self.evaluators is None:
+            self.evaluators = [scenario.evaluator() for scenario in self.scenarios]
+        return self.evaluators
+
+    def evaluate(self, population, processes=None, chunk_size=None):
+        """
+        Score every individual of a population on every scenario (all towers use the individual's genes)
+        The work is split into tasks of one scenario and a chunk of individuals, spread over the processes.
+        :param population: list of individuals
+        :param processes: int, number of worker processes (None or 1 to evaluate in this process)
+        :param chunk_size: int, individuals per task (default: about 4 tasks per process)
+        :return: numpy array of shape (len(population), len(scenarios)), fraction of enemies killed
+        """
+        scores = np.zeros((len(population), len(self.scenarios)))
+        if not len(population) or not self.scenarios:
+            return scores
+        if not processes or processes == 1:
+            for j, evaluator in enumerate(self.get_evaluators()):
+                scores[:, j] = [evaluator.score([individual]) for individual in population]
+            return scores
+
+        if chunk_size is None:
+            chunks_per_scenario = math.ceil(4 * processes / len(self.scenarios))
+            chunk_size = math.ceil(len(population) / chunks_per_scenario)
+        tasks = [(j, start, population[start:start + chunk_size])
+                 for j in range(len(self.scenarios)) for start in range(0, len(population), chunk_size)]
+        for j, start, chunk_scores, deltas in self.get_pool(processes).imap_unordered(_score_chunk, tasks):
+            scores[start:start + len(chunk_scores), j] = chunk_scores
+            metrics.REGISTRY.merge_counters(deltas)
+        return scores
+
+    def score(self, population, aggregate=settings.GA_SCENARIO_AGGREGATE, processes=None):
+        """
+        Score every individual of a population over all the scenarios
+        :param population: list of individuals
+        :param aggregate: str, "mean" or "worst" (see AGGREGATES)
+        :param processes: int, number of worker processes (None or 1 to evaluate in this process)
+        :return: list of fitness scores, between 0 and 1
+        """
+        return aggregate_scores(self.evaluate(population, processes), aggregate).tolist()
+
+    def get_pool(self, processes):
+        """
+        Start the worker processes on first use; they attach to one shared copy of every scenario's
+        trajectories and are reused by the next evaluations
+        :param processes: int, number of worker processes
+        :return: multiprocessing.Pool
+        """
+        if self.pool is not None and self.processes != processes:
+            self.close()
+        if self.pool is None:
+            scenarios = []
+            for scenario in self.scenarios:
+                shared = WaveTrajectories(scenario.trajectories.arrays)
+                self.shared.append(shared)
+                scenarios.append((shared.share(), scenario.tower_positions, scenario.seed))
+            self.pool = Pool(processes, initializer=_init_worker, initargs=(scenarios,))
+            self.processes = processes
+        return self.pool
+
+    def close(self):
+        """
+        Stop the worker processes and release the shared memory (a later evaluation starts them again)
+        """
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        for shared in self.shared:
+            shared.close(unlink=True)
+        self.shared = []
+
+
+def place_towers(tile_map, waypoints, tower_positions=settings.TOWER_POSITIONS):
+    """
+    Place towers on the buildable tiles of a level, where they cover the most path (see game.placement)
+    The towers keep the number of the given entries and the type of the first one; the coverage is measured
+    with the middle of the range of that type.
+    :param tile_map: list of tile ids of the level
+    :param waypoints: list of (x, y) points of the enemy path
+    :param tower_positions: list of tower entries to place
+    :return: list of tower entries (see settings.TOWER_POSITIONS)
+    """
+    tower_type = tower_positions[0]["type"]
+    range_ = sum(settings.TOWER_TYPES[tower_type]["range"]) / 2
+    coverage_map = CoverageMap(tile_map, waypoints)
+    layout = PlacementOptimizer(coverage_map, tower_type, range_, len(tower_positions), seed=0).optimize()
+    return coverage_map.tower_positions(layout, tower_type)
+
+
+def aggregate_scores(scores, aggregate=settings.GA_SCENARIO_AGGREGATE):
+    """
+    Combine the scores of each individual over the scenarios
+    :param scores: numpy array of shape (N, S), see ScenarioRegistry.evaluate
+    :param aggregate: str, "mean" or "worst"
+    :return: numpy array of shape (N,)
+    """
+    if aggregate not in AGGREGATES:
+        raise ValueError(f"Unknown aggregate: {aggregate}")
+    return AGGREGATES[aggregate](scores, axis=1)
@@ -0,0 +1,183 @@
+import json
+import random
+import time
+
+import metrics
+import settings
+from enemies.enemy import Enemy
+from towers.projectile import ProjectilePool
+from towers.tower import Tower
+
+""" Headless simulation of the waves (no pygame), used to score tower genomes """
+
+
+def load_level(path='levels/level.tmj'):
+    """
+    Read the tile map and the enemy path of a level, the same way World.process_data does
+    :param path: str, path of the Tiled JSON map
+    :return: tuple (tile_map, waypoints)
+    """
+    with open(path) as file:
+        level_data = json.load(file)
+    tile_map = []
+    waypoints = []
+    for layer in level_data["layers"]:
+        if layer["name"] == "tilemap":
+            tile_map = layer["data"]
+        elif layer["name"] == "waypoints":
+            for obj in layer["objects"]:
+                for point in obj["polyline"]:
+                    waypoints.append((point.get("x"), point.get("y")))
+    return tile_map, waypoints
+
+
+def spawn_schedule(num_enemies, tick_time):
+    """
+    Calculate when each enemy of a wave spawns, one every settings.SPAWN_COOLDOWN ms
+    :param num_enemies: int, number of enemies in the wave
+    :param tick_time: float, duration of a tick, in ms
+    :return: list of ticks, relative to the start of the wave
+    """
+    spawn_ticks = []
+    tick = 0
+    last_spawn = 0
+    while len(spawn_ticks) < num_enemies:
+        tick += 1
+        if tick * tick_time - last_spawn > settings.SPAWN_COOLDOWN:
+            spawn_ticks.append(tick)
+            last_spawn = tick * tick_time
+    return spawn_ticks
+
+
+def hit_seed(seed):
+    """
+    Derive the seed of the hit rolls from the seed of a run, so they are not the same stream as the wave order
+    (random.Random only takes int, str or bytes seeds, hence the string)
+    :param seed: int, seed of the run (None for unseeded hit rolls)
+    :return: str or None
+    """
+    return None if seed is None else f"{seed}/hits"
+
+
+def make_towers(tower_positions, genomes, rng=random):
+    """
+    Create the towers of a level with the given genomes
+    :param tower_positions: list of tower entries (see settings.TOWER_POSITIONS)
+    :param genomes: list of [accuracy, cooldown, range, damage], assigned to the towers in turn
+    :param rng: source of the hit rolls, shared by the towers
+    :return: list of Tower
+    """
+    towers = []
+    for i, tower_data in enumerate(tower_positions):
+        tower = Tower(tower_data.get("id", i + 1), tower_data["type"], tower_data["x"], tower_data["y"],
+                      tower_data.get("angle", 0), rng)
+        tower.update_strategy_params(genomes[i % len(genomes)])
+        towers.append(tower)
+    return towers
+
+
+class Simulation:
+    def __init__(self, waypoints, tower_positions=None, spawn_data=None, seed=None, max_ticks=100000):
+        """
+        Simulate every wave at game speed 1, one tick per frame
+        :param waypoints: list of (x, y) points of the enemy path
+        :param tower_positions: list of tower entries (default settings.TOWER_POSITIONS)
+        :param spawn_data: list of waves (default settings.ENEMY_SPAWN_DATA)
+        :param seed: int, seed for the wave order and the hit rolls
+        :param max_ticks: int, safety limit on the number of ticks
+        """
+        self.waypoints = waypoints
+        self.tower_positions = settings.TOWER_POSITIONS if tower_positions is None else tower_positions
+        self.spawn_data = settings.ENEMY_SPAWN_DATA if spawn_data is None else spawn_data
+        self.seed = seed
+        self.max_ticks = max_ticks
+        self.tick_time = 1000 / settings.FPS  # ms per tick
+        # the simulation is the world of its towers (Tower.shoot fires into world.projectiles)
+        self.projectiles = ProjectilePool()
+        self.audio = None
+
+    def run(self, genomes):
+        """
+        Play all the waves with the given tower genomes
+        :param genomes: list of [accuracy, cooldown, range, damage], assigned to the towers in turn
+        :return: dict with killed, missed, total, health, shots, overkill, waves and ticks
+        """
+        start_time = time.perf_counter()
+        # separate generators, so the wave order does not depend on the hit rolls
+        wave_rng = random.Random(self.seed)
+        hit_rng = random.Random(hit_seed(self.seed))
+        towers = make_towers(self.tower_positions, genomes, hit_rng)
+        projectiles = self.projectiles
+        projectiles.clear()
+        projectiles.shots_fired = projectiles.overkill_shots = 0
+        health = settings.HEALTH
+        killed = missed = 0
+        waves = ticks = 0
+        spawn_data = self.spawn_data[:settings.TOTAL_WAVES]
+        total = sum(sum(wave.values()) for wave in spawn_data)
+
+        for wave in spawn_data:
+            enemy_list = [enemy_type for enemy_type, count in wave.items() for _ in range(count)]
+            wave_rng.shuffle(enemy_list)
+            schedule = spawn_schedule(len(enemy_list), self.tick_time)
+            enemies = []
+            spawned = wave_killed = wave_missed = 0
+            wave_start = ticks
+
+            while wave_killed + wave_missed < len(enemy_list) and health > 0 and ticks < self.max_ticks:
+                ticks += 1
+                current_time = ticks * self.tick_time
+
+                # move enemies and remove the ones that escaped or died
+                alive = []
+                for enemy in enemies:
+                    if enemy.health <= 0:
+                        wave_killed += 1
+                    elif enemy.move():
+                        health -= 1
+                        wave_missed += 1
+                    else:
+                        alive.append(enemy)
+                enemies = alive
+
+                # towers shoot (the target is only picked once the cooldown is over)
+                for tower in towers:
+                    if tower.ready(current_time):
+                        tower.update(enemies, current_time, self)
+                projectiles.update(enemies)
+
+                # spawn enemies
+                if spawned < len(enemy_list) and ticks - wave_start == schedule[spawned]:
+                    enemies.append(Enemy(enemy_list[spawned], self.waypoints))
+                    spawned += 1
+
+            killed += wave_killed
+            missed += wave_missed
+            projectiles.clear()
+            if wave_killed + wave_missed < len(enemy_list) or health <= 0:
+                break
+            waves += 1
+
+        delta_time = time.perf_counter() - start_time
+        metrics.SIM_TICKS.inc(ticks)
+        if delta_time > 0:
+            metrics.SIM_TICKS_PER_SECOND.set(ticks / delta_time)
+        return {
+            "killed": killed,
+            "missed": missed,
+            "total": total,
+            "health": health,
+            "shots": projectiles.shots_fired,
+            "overkill": projectiles.overkill_shots,
+            "waves": waves,
+            "ticks": ticks,
+        }
+
+    def score(self, genomes):
+        """
+        Score genomes by the fraction of enemies killed over all the waves
+        :param genomes: list of [accuracy, cooldown, range, damage]
+        :return: float, between 0 and 1
+        """
+        result = self.run(genomes)
+        return result["killed"] / result["total"] if result["total"] else 0.0
@@ -0,0 +1,460 @@
+import math
+import random
+import time
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+import metrics
+import settings
+from enemies.enemy import Enemy
+from game.simulation import hit_seed, make_towers, spawn_schedule
+from towers.projectile import ProjectilePool
+
+""" Precomputed enemy trajectories of the waves, replayed against towers without moving any enemy """
+
+ENEMY_TYPE_NAMES = sorted(settings.ENEMY_TYPES)
+NEVER = int(np.iinfo(np.int32).max)  # tick that never comes
+
+
+class WaveTrajectories:
+    def __init__(self, arrays):
+        """
+        Hold the precomputed trajectories (use WaveTrajectories.build or WaveTrajectories.attach)
+        Every enemy of a type follows the same track, so a track is stored once per type and each enemy
+        only keeps its type and spawn tick. Its position `step` ticks after spawning is
+        track[track_start[type] + step], and it escapes once step reaches track_length[type].
+        :param arrays: dict with the arrays track, track_start, track_length, enemy_types, spawn_ticks and wave_start
+        """
+        self.arrays = arrays
+        self.track = arrays["track"]  # (T, 2) positions of all the tracks, one after the other
+        self.track_start = arrays["track_start"]  # (num_types,) first row of each track
+        self.track_length = arrays["track_length"]  # (num_types,) number of positions of each track
+        self.enemy_types = arrays["enemy_types"]  # (N,) type of every enemy of every wave
+        self.spawn_ticks = arrays["spawn_ticks"]  # (N,) spawn tick, relative to the start of its wave
+        self.wave_start = arrays["wave_start"]  # (num_waves + 1,) first enemy of each wave
+        self.shared_blocks = []
+
+    @classmethod
+    def build(cls, waypoints, spawn_data=None, seed=None, dtype=np.float32):
+        """
+        Precompute the trajectories of every wave (same wave order as Simulation with the same seed)
+        :param waypoints: list of (x, y) points of the enemy path
+        :param spawn_data: list of waves (default settings.ENEMY_SPAWN_DATA)
+        :param seed: int, seed for the wave order
+        :param dtype: numpy float type of the positions
+        :return: WaveTrajectories
+        """
+        spawn_data = (settings.ENEMY_SPAWN_DATA if spawn_data is None else spawn_data)[:settings.TOTAL_WAVES]
+        tick_time = 1000 / settings.FPS
+
+        tracks = []
+        for enemy_type in ENEMY_TYPE_NAMES:
+            enemy = Enemy(enemy_type, waypoints)
+            track = [tuple(enemy.pos)]
+            while not enemy.move():
+                track.append(tuple(enemy.pos))
+            tracks.append(np.array(track, dtype=dtype))
+        track_length = np.array([len(track) for track in tracks], dtype=np.int32)
+
+        wave_rng = random.Random(seed)
+        enemy_types = []
+        spawn_ticks = []
+        wave_start = [0]
+        for wave in spawn_data:
+            enemy_list = [enemy_type for enemy_type, count in wave.items() for _ in range(count)]
+            wave_rng.shuffle(enemy_list)
+            enemy_types.extend(ENEMY_TYPE_NAMES.index(enemy_type) for enemy_type in enemy_list)
+            spawn_ticks.extend(spawn_schedule(len(enemy_list), tick_time))
+            wave_start.append(len(enemy_types))
+
+        return cls({
+            "track": np.concatenate(tracks),
+            "track_start": np.concatenate(([0], np.cumsum(track_length)[:-1])).astype(np.int32),
+            "track_length": track_length,
+            "enemy_types": np.array(enemy_types, dtype=np.int32),
+            "spawn_ticks": np.array(spawn_ticks, dtype=np.int32),
+            "wave_start": np.array(wave_start, dtype=np.int32),
+        })
+
+    @property
+    def num_waves(self):
+        return len(self.wave_start) - 1
+
+    def share(self):
+        """
+        Copy the arrays into shared memory, so worker processes can attach to them without copies
+        :return: dict, picklable handle to pass to WaveTrajectories.attach
+        """
+        handle = {}
+        for name, array in self.arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+            self.shared_blocks.append(block)
+            handle[name] = (block.name, array.shape, array.dtype.str)
+        return handle
+
+    @classmethod
+    def attach(cls, handle):
+        """
+        Use trajectories shared by another process (see share)
+        :param handle: dict returned by share
+        :return: WaveTrajectories backed by the shared memory
+        """
+        blocks = []
+        arrays = {}
+        for name, (block_name, shape, dtype) in handle.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            arrays[name] = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+        trajectories = cls(arrays)
+        trajectories.shared_blocks = blocks
+        return trajectories
+
+    def close(self, unlink=False):
+        """
+        Release the shared memory blocks
+        :param unlink: bool, also destroy the blocks (only the process that called share should do it)
+        """
+        self.arrays = self.track = None
+        for block in self.shared_blocks:
+            block.close()
+            if unlink:
+                block.unlink()
+        self.shared_blocks = []
+
+
+class TrackedEnemy:
+    __slots__ = ("index", "replay")
+
+    def __init__(self, index, replay):
+        self.index = index
+        self.replay = replay
+
+    @property
+    def pos(self):
+        return self.replay.positions[self.index].tolist()  # python floats, cheaper for the tower arithmetic
+
+    @property
+    def health(self):
+        return self.replay.health[self.index]
+
+    @health.setter
+    def health(self, value):
+        self.replay.health[self.index] = value
+
+
+class TrajectoryEvaluator:
+    def __init__(self, trajectories, tower_positions=None, seed=None, max_ticks=100000):
+        """
+        Replay towers against precomputed trajectories; produces the same results as Simulation.run
+        Only the ticks where something can happen are played: an enemy spawns, escapes or is removed, a tower
+        shoots or a projectile lands. The ticks where a tower can shoot are found from the rows of the tracks in
+        its range, and the projectiles just move through the ticks in between.
+        :param trajectories: WaveTrajectories of the waves
+        :param tower_positions: list of tower entries (default settings.TOWER_POSITIONS)
+        :param seed: int, seed for the hit rolls (use the seed of the trajectories to match Simulation)
+        :param max_ticks: int, safety limit on the number of ticks
+        """
+        self.trajectories = trajectories
+        self.tower_positions = settings.TOWER_POSITIONS if tower_positions is None else tower_positions
+        self.seed = seed
+        self.max_ticks = max_ticks
+        self.tick_time = 1000 / settings.FPS
+        num_enemies = len(trajectories.enemy_types)
+        self.positions = np.zeros((num_enemies, 2), dtype=np.float64)
+        self.health = np.zeros(num_enemies, dtype=np.float64)
+        self.enemies = [TrackedEnemy(i, self) for i in range(num_enemies)]
+        # the evaluator is the world of its towers (Tower.shoot fires into world.projectiles)
+        self.projectiles = ProjectilePool()
+        self.audio = None
+        enemy_health = [settings.ENEMY_TYPES[enemy_type]["health"] for enemy_type in ENEMY_TYPE_NAMES]
+        self.initial_health = np.array(enemy_health, dtype=np.float64)[trajectories.enemy_types]
+        # end (exclusive) of the track of every row of the tracks
+        self.track_end = np.repeat(trajectories.track_start + trajectories.track_length, trajectories.track_length)
+        self.track_distances = None  # (num_towers, T) distance from every tower to every row, computed on first run
+
+    def in_range_rows(self, towers):
+        """
+        Find, for every tower and every row of the tracks, the next row of the same track in range of the tower
+        :param towers: list of Tower (the positions of the towers of the evaluator, with the ranges of a genome)
+        :return: int64 numpy array of shape (num_towers, T), NEVER where the rest of the track stays out of range
+        """
+        if self.track_distances is None:
+            track = self.trajectories.track.astype(np.float64)
+            x_dist = track[:, 0][None, :] - np.array([tower.x for tower in towers])[:, None]
+            y_dist = track[:, 1][None, :] - np.array([tower.y for tower in towers])[:, None]
+            self.track_distances = np.sqrt(x_dist ** 2 + y_dist ** 2)
+        tower_range = np.array([tower.range for tower in towers], dtype=np.float64)
+        rows = np.where(self.track_distances < tower_range[:, None], np.arange(self.track_distances.shape[1]), NEVER)
+        rows = np.minimum.accumulate(rows[:, ::-1], axis=1)[:, ::-1]
+        rows[rows >= self.track_end] = NEVER  # the next row in range belongs to the track of another type
+        return rows
+
+    def ready_tick(self, tower):
+        """
+        :param tower: Tower
+        :return: int, first tick at which the cooldown of the tower is over
+        """
+        tick = math.ceil((tower.last_shot_time + tower.cooldown) / self.tick_time) - 1
+        while not tower.ready(tick * self.tick_time):
+            tick += 1
+        return tick
+
+    def shot_ticks(self, in_range_rows, ready_ticks, from_tick, alive, track_start, escape_ticks):
+        """
+        Find, for every tower, the first tick from from_tick on at which it can shoot at one of the enemies on the
+        path (it holds until an enemy spawns, escapes or dies, or a tower shoots)
+        :param in_range_rows: numpy array returned by in_range_rows
+        :param ready_ticks: numpy array, tick at which the cooldown of each tower is over
+        :param from_tick: int, first tick to consider
+        :param alive: numpy array, enemies on the path
+        :param track_start: numpy array, row of the track of each enemy at tick 0
+        :param escape_ticks: numpy array, tick at which each enemy reaches the end of its track
+        :return: numpy array of ticks relative to the start of the wave, NEVER for the towers that cannot shoot
+        before the enemies escape
+        """
+        if not len(alive):
+            return np.full(len(in_range_rows), NEVER)
+        ready = np.maximum(ready_ticks, from_tick)[:, None]
+        start = track_start[alive][None, :]
+        on_track = ready < escape_ticks[alive][None, :]
+        rows = in_range_rows[np.arange(len(in_range_rows))[:, None], np.where(on_track, start + ready, 0)]
+        return np.where(on_track & (rows != NEVER), rows - start, NEVER).min(axis=1)
+
+    def run(self, genomes):
+        """
+        Play all the waves with the given tower genomes
+        :param genomes: list of [accuracy, cooldown, range, damage], assigned to the towers in turn
+        :return: dict with killed, missed, total, health, shots, overkill, waves and ticks
+        """
+        start_time = time.perf_counter()
+        trajectories = self.trajectories
+        hit_rng = random.Random(hit_seed(self.seed))
+        towers = make_towers(self.tower_positions, genomes, hit_rng)
+        tower_x = np.array([tower.x for tower in towers])
+        tower_y = np.array([tower.y for tower in towers])
+        tower_range = np.array([tower.range for tower in towers], dtype=np.float64)
+        splash = any(tower.splash for tower in towers)  # the landings need the positions of the enemies around
+        in_range_rows = self.in_range_rows(towers)
+        ready_ticks = np.array([self.ready_tick(tower) for tower in towers])
+        projectiles = self.projectiles
+        projectiles.clear()
+        projectiles.shots_fired = projectiles.overkill_shots = 0
+        self.health[:] = self.initial_health
+        health = settings.HEALTH
+        killed = missed = 0
+        waves = ticks = 0
+
+        for wave in range(trajectories.num_waves):
+            first, last = trajectories.wave_start[wave], trajectories.wave_start[wave + 1]
+            num_enemies = last - first
+            types = trajectories.enemy_types[first:last]
+            spawn_ticks = trajectories.spawn_ticks[first:last]
+            track_start = trajectories.track_start[types] - spawn_ticks  # row of the track at tick 0 of the wave
+            escape_ticks = spawn_ticks + trajectories.track_length[types]
+            positions = self.positions[first:last]
+            wave_health = self.health[first:last]
+            spawn_list = spawn_ticks.tolist() + [NEVER]
+            alive = np.zeros(0, dtype=np.int64)  # indices (in the wave) of the enemies on the path
+            next_escape = NEVER
+            killing = False  # a projectile killed an enemy in the previous tick
+            next_shot = None  # first tick a tower can shoot at an enemy on the path, None once they change
+            tower_shots = None  # first tick each tower can shoot
+            spawned = wave_killed = wave_missed = 0
+            wave_start = ticks
+            wave_tick = 0
+
+            while wave_killed + wave_missed < num_enemies and health > 0 and ticks < self.max_ticks:
+                # jump to the next tick where something can happen: the dead enemies are removed the tick after a
+                # projectile killed them, otherwise the next spawn, escape, landing or shot
+                if next_shot is None:
+                    tower_shots = self.shot_ticks(in_range_rows, ready_ticks - wave_start, wave_tick + 1, alive,
+                                                  track_start, escape_ticks)
+                    next_shot = int(tower_shots.min())
+                landing_tick = wave_tick + projectiles.next_arrival() if len(projectiles) else NEVER
+                if killing:
+                    next_tick = wave_tick + 1
+                else:
+                    next_tick = min(spawn_list[spawned], next_escape, next_shot, landing_tick)
+                if next_tick == NEVER or wave_start + next_tick > self.max_ticks:
+                    ticks = self.max_ticks
+                    break
+                if next_tick > wave_tick + 1 and len(projectiles):
+                    projectiles.update((), next_tick - wave_tick - 1)  # no projectile lands in the skipped ticks
+                wave_tick = next_tick
+                ticks = wave_start + wave_tick
+                current_time = ticks * self.tick_time
+
+                if len(alive):
+                    # cut off the trajectories of dead enemies, then remove the ones at the end of their track
+                    if killing:
+                        dead = wave_health[alive] <= 0
+                        wave_killed += int(dead.sum())
+                        alive = alive[~dead]
+                        next_escape = int(escape_ticks[alive].min(initial=NEVER))
+                        next_shot = None
+                    if wave_tick >= next_escape:
+                        escaped = escape_ticks[alive] <= wave_tick
+                        num_escaped = int(escaped.sum())
+                        wave_missed += num_escaped
+                        health -= num_escaped
+                        alive = alive[~escaped]
+                        next_escape = int(escape_ticks[alive].min(initial=NEVER))
+                        next_shot = None
+
+                # enemies were removed, the towers may now shoot from this tick on
+                if next_shot is None:
+                    tower_shots = self.shot_ticks(in_range_rows, ready_ticks - wave_start, wave_tick, alive,
+                                                  track_start, escape_ticks)
+                    next_shot = int(tower_shots.min())
+                shooting = wave_tick == next_shot
+
+                # positions are only looked up when a tower shoots or a splash projectile lands
+                if len(alive) and (shooting or splash and wave_tick == landing_tick):
+                    positions[alive] = trajectories.track[track_start[alive] + wave_tick]
+
+                # the towers that can shoot now find the enemies in range at once, then each picks its target
+                if len(alive) and shooting:
+                    shooters = np.flatnonzero(tower_shots == wave_tick)
+                    x_dist = positions[alive, 0][None, :] - tower_x[shooters, None]
+                    y_dist = positions[alive, 1][None, :] - tower_y[shooters, None]
+                    in_range = np.sqrt(x_dist ** 2 + y_dist ** 2) < tower_range[shooters, None]
+                    for row, i in enumerate(shooters):
+                        if in_range[row].any():
+                            targets = [self.enemies[first + j] for j in alive[in_range[row]]]
+                            towers[i].update(targets, current_time, self)
+                            ready_ticks[i] = self.ready_tick(towers[i])
+                    next_shot = None
+                in_flight = len(projectiles)
+                projectiles.update(self.enemies[first + i] for i in alive)
+                landed = len(projectiles) < in_flight or projectiles.num_free == 0
+                killing = landed and bool((wave_health[alive] <= 0).any())
+
+                # spawn enemies
+                if wave_tick == spawn_list[spawned]:
+                    positions[spawned] = trajectories.track[track_start[spawned] + wave_tick]
+                    alive = np.append(alive, spawned)
+                    next_escape = min(next_escape, int(escape_ticks[spawned]))
+                    next_shot = None
+                    spawned += 1
+
+            killed += wave_killed
+            missed += wave_missed
+            projectiles.clear()
+            if wave_killed + wave_missed < num_enemies or health <= 0:
+                break
+            waves += 1
+
+        delta_time = time.perf_counter() - start_time
+        metrics.SIM_TICKS.inc(ticks)
+        if delta_time > 0:
+            metrics.SIM_TICKS_PER_SECOND.set(ticks / delta_time)
+        return {
+            "killed": killed,
+            "missed": missed,
+            "total": len(trajectories.enemy_types),
+            "health": health,
+            "shots": projectiles.shots_fired,
+            "overkill": projectiles.overkill_shots,
+            "waves": waves,
+            "ticks": ticks,
+        }
+
+    def score(self, genomes):
+        """
+        Score genomes by the fraction of enemies killed over all the waves
+        :param genomes: list of [accuracy, cooldown, range, damage]
+        :return: float, between 0 and 1
+        """
+        result = self.run(genomes)
+        return result["killed"] / result["total"] if result["total"] else 0.0
+
+
+_worker_evaluator = None
+
+
+def _init_worker(handle, tower_positions, seed):
+    global _worker_evaluator
+    _worker_evaluator = TrajectoryEvaluator(WaveTrajectories.attach(handle), tower_positions, seed)
+
+
+def _score_individual(individual):
+    counters = metrics.REGISTRY.counter_values()
+    return _worker_evaluator.score([individual]), metrics.REGISTRY.counter_deltas(counters)
+
+
+class PopulationScorer:
+    def __init__(self, trajectories, tower_positions=None, seed=None, processes=None):
+        """
+        Score the populations of a run on the same trajectories; the worker processes and the shared copy of the
+        trajectories are created on the first evaluation and kept for the next generations, until close
+        :param trajectories: WaveTrajectories of the waves
+        :param tower_positions: list of tower entries (default settings.TOWER_POSITIONS)
+        :param seed: int, seed for the hit rolls
+        :param processes: int, number of worker processes (None or 1 to evaluate in this process)
+        """
+        self.trajectories = trajectories
+        self.tower_positions = tower_positions
+        self.seed = seed
+        self.processes = processes
+        self.evaluator = None  # evaluator of this process, created on first use
+        self.pool = None
+        self.shared = None  # shared copy of the trajectories used by the workers
+
+    def score(self, population):
+        """
+        Score every individual of a population (all towers use the individual's genes)
+        :param population: list of individuals
+        :return: list of fitness scores, between 0 and 1
+        """
+        if not self.processes or self.processes == 1:
+            if self.evaluator is None:
+                self.evaluator = TrajectoryEvaluator(self.trajectories, self.tower_positions, self.seed)
+            return [self.evaluator.score([individual]) for individual in population]
+
+        scores = []
+        for score, deltas in self.get_pool().map(_score_individual, population):
+            metrics.REGISTRY.merge_counters(deltas)  # e.g. the ticks simulated by the worker
+            scores.append(score)
+        return scores
+
+    def get_pool(self):
+        """
+        Start the worker processes on first use, attached to one shared copy of the trajectories
+        :return: multiprocessing.Pool
+        """
+        if self.pool is None:
+            self.shared = WaveTrajectories(self.trajectories.arrays)
+            self.pool = Pool(self.processes, initializer=_init_worker,
+                             initargs=(self.shared.share(), self.tower_positions, self.seed))
+        return self.pool
+
+    def close(self):
+        """
+        Stop the worker processes and release the shared memory (a later evaluation starts them again)
+        """
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        if self.shared is not None:
+            self.shared.close(unlink=True)
+            self.shared = None
+
+
+def score_population(trajectories, population, tower_positions=None, seed=None, processes=None):
+    """
+    Score every individual of a population once (use a PopulationScorer to keep the workers between generations)
+    :param trajectories: WaveTrajectories of the waves
+    :param population: list of individuals
+    :param tower_positions: list of tower entries (default settings.TOWER_POSITIONS)
+    :param seed: int, seed for the hit rolls
+    :param processes: int, number of worker processes (None or 1 to evaluate in this process)
+    :return: list of fitness scores, between 0 and 1
+    """
+    scorer = PopulationScorer(trajectories, tower_positions, seed, processes)
+    try:
+        return scorer.score(population)
+    finally:
+        scorer.close()
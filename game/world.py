@@ -2,29 +2,30 @@ import random
 import settings
 import pygame as pg
 from towers.tower import Tower
+from towers.tower_sprite import TowerSprite
+from towers.projectile import ProjectilePool
 
 
 class World:
-    def __init__(self, data, map_image):
+    def __init__(self, data, map_image, audio=None):
         self.wave_number = 0
         self.game_speed = 1
         self.towers = []
-        self.tower_group = pg.sprite.Group()
+        self.tower_sprites = None  # created on the first draw, a world that is never drawn loads no images
+        self.enemies = []
+        self.projectiles = ProjectilePool()
         self.tile_map = []
         self.health = 5
         self.waypoints = []
         self.level_data = data
         self.image = map_image
+        self.audio = audio
         self.enemy_list = []
         self.spawned_enemies = 0
         self.killed_enemies = 0
         self.missed_enemies = 0
-        self.tower_spritesheets = []
-        for x in range(1, settings.TOWER_LEVELS + 1):
-            tower_sheet = pg.image.load(f'assets/images/towers/cannon{x}.png').convert_alpha()
-            self.tower_spritesheets.append(tower_sheet)
 
-    def process_data(self):
+    def process_data(self, tower_positions=None):
         # look through data to extract relevant info
         for layer in self.level_data["layers"]:
             if layer["name"] == "tilemap":
@@ -34,8 +35,10 @@ class World:
                     waypoint_data = obj["polyline"]
                     self.process_waypoints(waypoint_data)
 
-        # Process initial towers
-        for tower_data in settings.TOWER_POSITIONS:
+        # Process initial towers (a layout from game.placement can replace the default positions)
+        if tower_positions is None:
+            tower_positions = settings.TOWER_POSITIONS
+        for tower_data in tower_positions:
             # Extract tower data
             tower_id = tower_data["id"]
             tower_type = tower_data["type"]
@@ -46,9 +49,8 @@ class World:
             self.create_towers(tower_id, tower_type, tile_x, tile_y, angle)
 
     def create_towers(self, tower_id, tower_type, tile_x, tile_y, angle):
-        new_tower = Tower(tower_id, tower_type, self.tower_spritesheets, tile_x, tile_y, angle)
+        new_tower = Tower(tower_id, tower_type, tile_x, tile_y, angle, verbose=True)
         self.towers.append(new_tower)
-        self.tower_group.add(new_tower)  # Add to a group or list of towers
 
     def process_waypoints(self, data):
         # iterate through waypoints to extract individual sets of x and y coordinates
@@ -66,6 +68,10 @@ class World:
         # now randomize the list to shuffle the enemies
         random.shuffle(self.enemy_list)
 
+    def update_enemies(self):
+        # move the enemies and drop the ones that escaped or died
+        self.enemies = [enemy for enemy in self.enemies if enemy.update(self)]
+
     def check_level_complete(self):
         if (self.killed_enemies + self.missed_enemies) == len(self.enemy_list):
             return True
@@ -76,3 +82,14 @@ class World:
 
     def draw(self, surface):
         surface.blit(self.image, (0, 0))
+
+    def draw_towers(self, surface, current_time):
+        if self.tower_sprites is None:
+            self.tower_sprites = pg.sprite.Group([TowerSprite(tower) for tower in self.towers])
+        self.tower_sprites.update(current_time)
+        for sprite in self.tower_sprites:
+            sprite.draw(surface)
+
+    def draw_projectiles(self, surface):
+        for x, y in zip(*self.projectiles.positions()):
+            pg.draw.circle(surface, "grey10", (int(x), int(y)), 3)
@@ -1,10 +1,12 @@
 import pygame as pg
 from game.game import Game
+import metrics
 import settings
 
 
 def main():
     pg.init()
+    metrics.start()  # only if enabled in settings (METRICS_PORT / METRICS_SNAPSHOT_PATH)
     clock = pg.time.Clock()
     screen = pg.display.set_mode((settings.SCREEN_WIDTH + settings.SIDE_PANEL, settings.SCREEN_HEIGHT))
     pg.display.set_caption("pyTowerr - A Python Tower Defense 2D game for Genetic Algorithms")
@@ -0,0 +1,286 @@
+import atexit
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import settings
+
+""" Optional runtime metrics: lock-free counters and gauges, served in Prometheus text format and as JSON snapshots """
+
+
+class Counter:
+    __slots__ = ("name", "help", "local", "cells")
+
+    def __init__(self, name, help_text):
+        """
+        Monotonic counter. Every thread increments its own cell, so increments never lock nor get lost;
+        reading sums the cells.
+        :param name: str, metric name
+        :param help_text: str, description of the metric
+        """
+        self.name = name
+        self.help = help_text
+        self.local = threading.local()
+        self.cells = []
+
+    def inc(self, amount=1):
+        try:
+            cell = self.local.cell
+        except AttributeError:
+            cell = self.local.cell = [0]
+            self.cells.append(cell)
+        cell[0] += amount
+
+    @property
+    def value(self):
+        return sum(cell[0] for cell in list(self.cells))
+
+
+class Gauge:
+    __slots__ = ("name", "help", "value_", "function")
+
+    def __init__(self, name, help_text, function=None):
+        """
+        Value that goes up and down, set by its producer (a single assignment) or read from a function
+        :param name: str, metric name
+        :param help_text: str, description of the metric
+        :param function: function without arguments that returns the value when it is read
+        """
+        self.name = name
+        self.help = help_text
+        self.value_ = 0.0
+        self.function = function
+
+    def set(self, value):
+        self.value_ = value
+
+    @property
+    def value(self):
+        return self.function() if self.function else self.value_
+
+
+class Window:
+    __slots__ = ("name", "help", "quantiles", "values", "count", "total")
+
+    def __init__(self, name, help_text, size=1024, quantiles=(0.5, 0.9, 0.99)):
+        """
+        Percentiles of the last `size` observations (ring buffer written by a single thread, e.g. frame times)
+        :param name: str, metric name
+        :param help_text: str, description of the metric
+        :param size: int, number of observations kept
+        :param quantiles: tuple of floats, quantiles to report
+        """
+        self.name = name
+        self.help = help_text
+        self.quantiles = quantiles
+        self.values = np.zeros(size)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.values[self.count % len(self.values)] = value
+        self.count += 1
+        self.total += value
+
+    def percentiles(self):
+        """
+        :return: dict quantile -> value (empty before the first observation)
+        """
+        values = self.values[:min(self.count, len(self.values))].copy()
+        if not len(values):
+            return {}
+        return dict(zip(self.quantiles, np.quantile(values, self.quantiles).tolist()))
+
+
+def resident_memory():
+    """
+    Get the resident set size of this process
+    :return: int, bytes (peak RSS where the current one is not available, 0 if neither is)
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Registry:
+    def __init__(self, prefix="pytowerr_"):
+        """
+        Collection of metrics, exported in Prometheus text format or as a JSON snapshot
+        :param prefix: str, prefix of every metric name
+        """
+        self.prefix = prefix
+        self.metrics = {}
+
+    def add(self, metric):
+        metric.name = self.prefix + metric.name
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text):
+        return self.add(Counter(name, help_text))
+
+    def gauge(self, name, help_text, function=None):
+        return self.add(Gauge(name, help_text, function))
+
+    def window(self, name, help_text, size=1024):
+        return self.add(Window(name, help_text, size))
+
+    def counter_values(self):
+        """
+        :return: dict name -> value of every counter
+        """
+        return {name: metric.value for name, metric in self.metrics.items() if isinstance(metric, Counter)}
+
+    def counter_deltas(self, since):
+        """
+        Get how much each counter grew, so a worker process can send its work to the parent (see merge_counters)
+        :param since: dict returned by counter_values before the work
+        :return: dict name -> increment (only the counters that changed)
+        """
+        deltas = {}
+        for name, value in self.counter_values().items():
+            if value != since.get(name, 0):
+                deltas[name] = value - since.get(name, 0)
+        return deltas
+
+    def merge_counters(self, deltas):
+        """
+        Add the counter increments of a worker process to the counters of this process
+        :param deltas: dict returned by counter_deltas in the worker
+        """
+        for name, amount in deltas.items():
+            self.metrics[name].inc(amount)
+
+    def render_prometheus(self):
+        """
+        :return: str, every metric in the Prometheus text exposition format
+        """
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.help}")
+            if isinstance(metric, Counter):
+                lines.append(f"# TYPE {name} counter")
+                lines.append(f"{name} {metric.value}")
+            elif isinstance(metric, Gauge):
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {metric.value}")
+            else:
+                lines.append(f"# TYPE {name} summary")
+                for quantile, value in metric.percentiles().items():
+                    lines.append(f'{name}{{quantile="{quantile}"}} {value}')
+                lines.append(f"{name}_sum {metric.total}")
+                lines.append(f"{name}_count {metric.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """
+        :return: dict with the current value of every metric (percentiles for windows)
+        """
+        values = {"timestamp": time.time()}
+        for name, metric in self.metrics.items():
+            if isinstance(metric, Window):
+                values[name] = {str(quantile): value for quantile, value in metric.percentiles().items()}
+            else:
+                values[name] = metric.value
+        return values
+
+    def write_snapshot(self, path):
+        """
+        Write a JSON snapshot atomically (readers never see a partial file)
+        :param path: str, path of the JSON file
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as file:
+            json.dump(self.snapshot(), file, indent=2)
+        os.replace(tmp_path, path)
+
+
+REGISTRY = Registry()
+
+# genetic algorithm (the pools of PopulationScorer, ScenarioRegistry and run_sweep merge the counters of their
+# workers into the parent process; pygad only returns the fitness values, so its workers' counters are not merged)
+GENERATION = REGISTRY.gauge("ga_generation", "Current generation of the genetic algorithm")
+BEST_FITNESS = REGISTRY.gauge("ga_best_fitness", "Best fitness of the last evaluated generation")
+AVG_FITNESS = REGISTRY.gauge("ga_avg_fitness", "Mean fitness of the last evaluated generation")
+EVALUATIONS = REGISTRY.counter("ga_evaluations_total", "Fitness evaluations")
+EVALUATIONS_PER_SECOND = REGISTRY.gauge("ga_evaluations_per_second", "Fitness evaluations per second (last generation)")
+CACHE_HITS = REGISTRY.counter("ga_cache_hits_total", "Fitness lookups answered by the fitness cache")
+CACHE_MISSES = REGISTRY.counter("ga_cache_misses_total", "Fitness lookups that had to be evaluated")
+REGISTRY.gauge("ga_cache_hit_rate", "Fraction of fitness lookups answered by the cache",
+               lambda: CACHE_HITS.value / max(1, CACHE_HITS.value + CACHE_MISSES.value))
+
+# headless simulation
+SIM_TICKS = REGISTRY.counter("sim_ticks_total", "Simulated ticks")
+SIM_TICKS_PER_SECOND = REGISTRY.gauge("sim_ticks_per_second", "Simulated ticks per second (last run)")
+
+# game
+FRAME_TIME = REGISTRY.window("frame_time_ms", "Frame time of Game.run, in ms")
+
+# process
+REGISTRY.gauge("process_resident_memory_bytes", "Resident memory of the process", resident_memory)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path in ("/", "/metrics"):
+            body = self.registry.render_prometheus().encode()
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path == "/metrics.json":
+            body = json.dumps(self.registry.snapshot()).encode()
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # no output per scrape
+
+
+def start(port=settings.METRICS_PORT, snapshot_path=settings.METRICS_SNAPSHOT_PATH,
+          snapshot_interval=settings.METRICS_SNAPSHOT_INTERVAL, host="127.0.0.1"):
+    """
+    Start exporting the metrics (nothing is started for the options that are None)
+    :param port: int, port of the local HTTP endpoint (/metrics in Prometheus format, /metrics.json)
+    :param snapshot_path: str, JSON file rewritten every snapshot_interval seconds
+    :param snapshot_interval: float, seconds between snapshots
+    :param host: str, address the HTTP endpoint listens on
+    :return: HTTP server, or None
+    """
+    server = None
+    if port is not None:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    if snapshot_path:
+        atexit.register(REGISTRY.write_snapshot, snapshot_path)  # last values of the run
+
+        def write_snapshots():
+            while True:
+                REGISTRY.write_snapshot(snapshot_path)
+                time.sleep(snapshot_interval)
+
+        threading.Thread(target=write_snapshots, name="metrics-snapshot", daemon=True).start()
+    return server
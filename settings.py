@@ -1,9 +1,6 @@
 # Authors: Antonio Raimundo
 # Partial credits to: Brandon Fong and Michael Ou
 
-# Import pygame
-import pygame as pg
-
 # Game settings
 ROWS = 15
 COLS = 15
@@ -15,6 +12,12 @@ FPS = 60
 HEALTH = 5
 TOTAL_WAVES = 3
 GAME_MODE = "GENETIC_ALGORITHM"  # MANUAL, GENETIC_ALGORITHM, QLEARNING
+BUILDABLE_TILES = [7]  # tile ids (tilemap layer) where towers can be placed
+
+# Audio
+AUDIO_CHANNELS = 4  # mixer channels reserved for shot sounds
+AUDIO_COALESCE_WINDOW = 50  # shots within this window (ms) are played as one
+AUDIO_MUTE_SPEED = 4  # game speeds above this value are muted
 
 # Enemies
 SPAWN_COOLDOWN = 400
@@ -22,12 +25,12 @@ ENEMY_TYPES = {
     "zombie": {
         "health": 10,
         "speed": 2,
-        "image": pg.image.load('assets/images/enemies/zombie.png'),
+        "image": 'assets/images/enemies/zombie.png',
     },
     "warrior": {
         "health": 20,
         "speed": 3,
-        "image": pg.image.load('assets/images/enemies/warrior.png'),
+        "image": 'assets/images/enemies/warrior.png',
     },
 }
 ENEMY_SPAWN_DATA = [
@@ -55,15 +58,20 @@ TOWER_TYPES = {
         "range": [50, 100],
         "cooldown": [100, 4000],
         "damage": [1, 3],
-        "image": pg.image.load('assets/images/towers/cannon1.png'),
+        "projectile_speed": 8,  # distance travelled per frame
+        "splash": 0,  # radius of the area damage (0 for single target)
+        "image": 'assets/images/towers/cannon1.png',
     },
     "cannon2": {
         "range": [90, 120],
         "cooldown": [400, 4000],
         "damage": [3, 5],
-        "image": pg.image.load('assets/images/towers/cannon2.png'),
+        "projectile_speed": 6,
+        "splash": 30,
+        "image": 'assets/images/towers/cannon2.png',
     },
 }
+PROJECTILE_POOL_SIZE = 4096  # maximum number of projectiles in flight
 TOWER_POSITIONS = [
     {
         "id": 0,
@@ -109,6 +117,23 @@ TOWER_POSITIONS = [
     },
 ]
 
+# Genetic Algorithm
+GA_CHECKPOINT_PATH = 'checkpoints/ga_{tower_type}.npz'  # checkpoint of the training runs (per tower type)
+GA_WARM_START_ELITES = 5  # best individuals carried over to a new training run
+GA_BACKEND = 'native'  # 'native' (algorithms.genetic_algorithm) or 'pygad' (algorithms.pygad_backend)
+GA_MODE = 'weighted'  # 'weighted' (single fitness) or 'nsga2' (Pareto front of stopped enemies, cost and shots)
+GA_STALL_GENERATIONS = 10  # generations without improving the best fitness before a run stops (None to disable)
+GA_MIN_DIVERSITY = 0.01  # genotype diversity below which a collapsed run stops (None to disable)
+GA_MAX_MUTATION_RATE = 0.5  # upper limit of the adaptive mutation rate
+GA_SWEEP_DATABASE_PATH = 'sweeps/ga_sweeps.sqlite'  # results of the hyperparameter sweeps
+GA_SCENARIOS_PATH = 'levels/scenarios.json'  # levels and waves of the multi-scenario evaluator
+GA_SCENARIO_AGGREGATE = 'mean'  # 'mean' or 'worst' score over the scenarios
+
+# Metrics (None disables the exporter)
+METRICS_PORT = None  # local HTTP endpoint, e.g. 9100 (http://127.0.0.1:9100/metrics)
+METRICS_SNAPSHOT_PATH = None  # JSON snapshot file, e.g. 'metrics.json'
+METRICS_SNAPSHOT_INTERVAL = 10  # seconds between snapshots
+
 # Animation
 ANIMATION_STEPS = 8
 ANIMATION_DELAY = 15
@@ -0,0 +1,173 @@
+import math
+
+import numpy as np
+
+import settings
+
+""" Fixed-capacity pool of projectiles stored as a structure of arrays (no allocation per shot) """
+
+
+class ProjectilePool:
+    def __init__(self, capacity=settings.PROJECTILE_POOL_SIZE):
+        """
+        Pool of projectile slots; the arrays are allocated on the first shot, so a pool that never fires
+        (e.g. a World that is only built for evaluation) costs no memory
+        :param capacity: int, maximum number of projectiles in flight
+        """
+        self.capacity = capacity
+        self.n_active = 0  # the projectiles in flight are kept in the first n_active slots, in firing order
+        self.x = None
+        # frames played by the pool; a projectile lands at the first update where the clock reaches its arrival
+        # (the clock only adds whole frames, so moving k frames at once lands on the same frame as k single frames)
+        self.clock = 0.0
+        self.next_landing = math.inf  # earliest arrival of the projectiles in flight
+        # statistics
+        self.shots_fired = 0
+        self.overkill_shots = 0  # shots that landed on an enemy that was already dead
+
+    def allocate(self):
+        """
+        Preallocate the arrays for every projectile slot
+        """
+        capacity = self.capacity
+        # one row per slot, so the slots are moved with a single copy; the columns are exposed as views
+        self.slots = np.zeros((capacity, 9), dtype=np.float64)
+        # origin, unit direction, clock at launch and at arrival on the target
+        self.x, self.y, self.dir_x, self.dir_y, self.launch, self.arrival = self.slots.T[:6]
+        # per-shot stats
+        self.speed, self.damage, self.splash = self.slots.T[6:]
+        self.targets = np.empty(capacity, dtype=object)
+
+    @property
+    def num_free(self):
+        return self.capacity - self.n_active
+
+    def __len__(self):
+        return self.n_active
+
+    def fire(self, x, y, target, damage, speed, splash=0):
+        """
+        Launch a projectile from (x, y) towards a target
+        The hit is resolved when the projectile arrives, against the health the target has by then.
+        If the pool is full the shot is resolved instantly on the target (no splash).
+        :param x: float, x coordinate of the tower
+        :param y: float, y coordinate of the tower
+        :param target: enemy with `pos` and `health` attributes
+        :param damage: float, damage dealt on impact (0 for a missed shot)
+        :param speed: float, distance travelled per frame
+        :param splash: float, radius of the area damage around the target (0 for single target)
+        """
+        self.shots_fired += 1
+        if self.x is None:
+            self.allocate()
+        if self.n_active == self.capacity:
+            self.hit(target, damage)
+            return
+
+        slot = self.n_active
+        self.n_active += 1
+        x_dist = target.pos[0] - x
+        y_dist = target.pos[1] - y
+        distance = (x_dist ** 2 + y_dist ** 2) ** 0.5
+        self.x[slot] = x
+        self.y[slot] = y
+        if distance > 0:
+            self.dir_x[slot] = x_dist / distance
+            self.dir_y[slot] = y_dist / distance
+        else:
+            self.dir_x[slot] = self.dir_y[slot] = 0
+        arrival = self.clock + distance / speed
+        self.launch[slot] = self.clock
+        self.arrival[slot] = arrival
+        self.next_landing = min(self.next_landing, arrival)
+        self.speed[slot] = speed
+        self.damage[slot] = damage
+        self.splash[slot] = splash
+        self.targets[slot] = target
+
+    def hit(self, target, damage):
+        if target.health <= 0:
+            self.overkill_shots += 1
+        target.health -= damage
+
+    def update(self, enemies, game_speed=1):
+        """
+        Move every projectile in flight and resolve the ones that reached their target
+        :param enemies: iterable of enemies (used for splash damage)
+        :param game_speed: int, game speed multiplier
+        """
+        n = self.n_active
+        if n == 0:
+            return
+
+        self.clock += game_speed
+        if self.clock < self.next_landing:
+            return
+
+        landing = self.arrival[:n] <= self.clock
+        arrived = np.flatnonzero(landing)
+        splash_enemies = None
+        splash_positions = None
+        for slot in arrived:
+            target = self.targets[slot]
+            damage = self.damage[slot]
+            radius = self.splash[slot]
+            if damage > 0:
+                if radius > 0:
+                    if splash_enemies is None:
+                        splash_enemies = list(enemies)
+                        splash_positions = np.array([enemy.pos for enemy in splash_enemies],
+                                                    dtype=np.float32).reshape(-1, 2)
+                    if target.health <= 0:
+                        self.overkill_shots += 1
+                    x_dist = splash_positions[:, 0] - target.pos[0]
+                    y_dist = splash_positions[:, 1] - target.pos[1]
+                    for i in np.flatnonzero(x_dist ** 2 + y_dist ** 2 <= radius ** 2):
+                        splash_enemies[i].health -= damage
+                else:
+                    self.hit(target, damage)
+
+        # release the slots, moving the projectiles still in flight to the front (in the same order)
+        flying = ~landing
+        left = n - len(arrived)
+        self.slots[:left] = self.slots[:n][flying]
+        self.targets[:left] = self.targets[:n][flying]
+        self.targets[left:n] = None
+        self.n_active = left
+        self.next_landing = self.arrival[:left].min() if left else math.inf
+
+    def next_arrival(self):
+        """
+        Get the number of frames (at game speed 1) until the next projectile reaches its target
+        :return: int, None if no projectile is in flight
+        """
+        if self.n_active == 0:
+            return None
+        frames = max(1, math.ceil(self.next_landing - self.clock))
+        # same test as update, in case the subtraction rounded
+        while frames > 1 and self.clock + frames - 1 >= self.next_landing:
+            frames -= 1
+        while self.clock + frames < self.next_landing:
+            frames += 1
+        return frames
+
+    def positions(self):
+        """
+        Get the position of every projectile in flight
+        :return: tuple of numpy arrays (x, y)
+        """
+        if self.x is None:
+            return np.empty(0), np.empty(0)
+        n = self.n_active
+        travelled = self.speed[:n] * (self.clock - self.launch[:n])
+        return self.x[:n] + self.dir_x[:n] * travelled, self.y[:n] + self.dir_y[:n] * travelled
+
+    def clear(self):
+        """
+        Remove every projectile in flight
+        """
+        if self.x is None:
+            return
+        self.targets[:self.n_active] = None
+        self.n_active = 0
+        self.next_landing = math.inf
@@ -0,0 +1,59 @@
+import pygame as pg
+import settings
+
+# frames of each sprite sheet, shared by every sprite (and every World) using it
+_animations = {}
+
+
+def load_animation(tower_type):
+    # extract images from spritesheet (once per tower type)
+    if tower_type not in _animations:
+        sprite_sheet = pg.image.load(f'assets/images/towers/{tower_type}.png').convert_alpha()
+        size = sprite_sheet.get_height()
+        _animations[tower_type] = [sprite_sheet.subsurface(x * size, 0, size, size)
+                                   for x in range(settings.ANIMATION_STEPS)]
+    return _animations[tower_type]
+
+
+class TowerSprite(pg.sprite.Sprite):
+    # render adapter of a towers.tower.Tower: only needed when the game is drawn
+    def __init__(self, tower):
+        pg.sprite.Sprite.__init__(self)
+        self.tower = tower
+
+        # animation variables
+        self.animation_list = load_animation(tower.tower_type)
+        self.frame_index = 0
+        self.update_time = pg.time.get_ticks()
+        self.original_image = self.animation_list[self.frame_index]
+        self.image = self.original_image
+        self.rect = self.image.get_rect(center=(tower.x, tower.y))
+
+    def update(self, current_time):
+        self.play_animation(current_time)
+
+    def play_animation(self, current_time):
+        if self.tower.is_shooting:
+            if current_time - self.update_time > settings.ANIMATION_DELAY:
+                self.update_time = current_time
+                self.frame_index += 1
+                # Check if all frames have been parsed
+                if self.frame_index >= len(self.animation_list):
+                    self.frame_index = 0  # Reset frame index
+                    self.tower.is_shooting = False  # Stop animation
+                # Update image based on the current frame
+                self.original_image = self.animation_list[self.frame_index]
+
+    def draw(self, surface):
+        tower = self.tower
+        self.image = pg.transform.rotate(self.original_image, tower.angle - 90)
+        self.rect = self.image.get_rect()
+        self.rect.center = (tower.x, tower.y)
+        surface.blit(self.image, self.rect)
+
+        # Draw the range circle
+        pg.draw.circle(surface, pg.Color("blue"), (int(tower.x), int(tower.y)), tower.range, 1)
+
+        # Draw a line to the target if it exists and is within range
+        if tower.target and tower.calculate_distance(tower.target) <= tower.range:
+            pg.draw.line(surface, pg.Color("red"), (tower.x, tower.y), (tower.target.pos[0], tower.target.pos[1]), 1)